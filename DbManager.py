@@ -187,8 +187,11 @@ CREATE TABLE IF NOT EXISTS "user" (
   is_client  BOOLEAN      NOT NULL DEFAULT FALSE,
   is_blacklisted BOOLEAN NOT NULL DEFAULT FALSE,
   is_deleted BOOLEAN      NOT NULL DEFAULT FALSE,
-  deleted_at TIMESTAMPTZ
+  deleted_at TIMESTAMPTZ,
+  full_name  TEXT         GENERATED ALWAYS AS (first_name || ' ' || last_name) STORED
 );
+
+ALTER TABLE "user" ADD COLUMN IF NOT EXISTS full_name TEXT GENERATED ALWAYS AS (first_name || ' ' || last_name) STORED;
 """
 
 # ──────────────────────────────────────────────────────────────────────────────
@@ -500,6 +503,57 @@ CREATE TRIGGER trg_new_notification_row
   EXECUTE FUNCTION notify_notification_insert();
 """
 
+LOOKUP_LISTEN_NOTIFY = """
+CREATE OR REPLACE FUNCTION notify_lookup_change() RETURNS trigger AS $$
+BEGIN
+  PERFORM pg_notify('lookup_invalidate', TG_TABLE_NAME);
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_status_lookup_change ON status;
+CREATE TRIGGER trg_status_lookup_change
+  AFTER INSERT OR UPDATE OR DELETE ON status
+  FOR EACH STATEMENT
+  EXECUTE FUNCTION notify_lookup_change();
+
+DROP TRIGGER IF EXISTS trg_state_lookup_change ON state;
+CREATE TRIGGER trg_state_lookup_change
+  AFTER INSERT OR UPDATE OR DELETE ON state
+  FOR EACH STATEMENT
+  EXECUTE FUNCTION notify_lookup_change();
+
+DROP TRIGGER IF EXISTS trg_client_type_lookup_change ON client_type;
+CREATE TRIGGER trg_client_type_lookup_change
+  AFTER INSERT OR UPDATE OR DELETE ON client_type
+  FOR EACH STATEMENT
+  EXECUTE FUNCTION notify_lookup_change();
+
+DROP TRIGGER IF EXISTS trg_project_priority_lookup_change ON project_priority;
+CREATE TRIGGER trg_project_priority_lookup_change
+  AFTER INSERT OR UPDATE OR DELETE ON project_priority
+  FOR EACH STATEMENT
+  EXECUTE FUNCTION notify_lookup_change();
+
+DROP TRIGGER IF EXISTS trg_project_type_lookup_change ON project_type;
+CREATE TRIGGER trg_project_type_lookup_change
+  AFTER INSERT OR UPDATE OR DELETE ON project_type
+  FOR EACH STATEMENT
+  EXECUTE FUNCTION notify_lookup_change();
+
+DROP TRIGGER IF EXISTS trg_project_trade_lookup_change ON project_trade;
+CREATE TRIGGER trg_project_trade_lookup_change
+  AFTER INSERT OR UPDATE OR DELETE ON project_trade
+  FOR EACH STATEMENT
+  EXECUTE FUNCTION notify_lookup_change();
+
+DROP TRIGGER IF EXISTS trg_pay_term_lookup_change ON pay_term;
+CREATE TRIGGER trg_pay_term_lookup_change
+  AFTER INSERT OR UPDATE OR DELETE ON pay_term
+  FOR EACH STATEMENT
+  EXECUTE FUNCTION notify_lookup_change();
+"""
+
 # ──────────────────────────────────────────────────────────────────────────────
 # 13: Notification
 # ──────────────────────────────────────────────────────────────────────────────
@@ -714,9 +768,12 @@ CREATE INDEX IF NOT EXISTS idx_proj_status      ON project(status_id);
 CREATE INDEX IF NOT EXISTS idx_proj_assignee    ON project(assignee_id);
 CREATE INDEX IF NOT EXISTS idx_proj_due         ON project(due_date);
 CREATE INDEX IF NOT EXISTS idx_proj_received    ON project(date_received);
-CREATE INDEX IF NOT EXISTS idx_proj_cursor      ON project (created_at DESC, id DESC) WHERE is_deleted = FALSE;
-CREATE INDEX IF NOT EXISTS idx_project_scheduled_month ON project (EXTRACT(MONTH FROM scheduled_date)) WHERE scheduled_date IS NOT NULL AND is_deleted = FALSE;
-CREATE INDEX IF NOT EXISTS idx_project_due_month ON project (EXTRACT(MONTH FROM due_date)) WHERE scheduled_date IS NULL AND is_deleted = FALSE;
+CREATE INDEX IF NOT EXISTS idx_proj_cursor      ON project (created_at DESC, id DESC) INCLUDE (client_id, status_id) WHERE is_deleted = FALSE;
+--- calendar branches: INCLUDE the event columns so a month is an index-only range scan
+DROP INDEX IF EXISTS idx_project_scheduled_date;
+DROP INDEX IF EXISTS idx_project_due_unscheduled;
+CREATE INDEX IF NOT EXISTS idx_project_calendar_scheduled ON project (scheduled_date) INCLUDE (id, business_name, client_id, status_id, priority_id, due_date) WHERE is_deleted = FALSE;
+CREATE INDEX IF NOT EXISTS idx_project_calendar_due ON project (due_date) INCLUDE (id, business_name, client_id, status_id, priority_id) WHERE scheduled_date IS NULL AND is_deleted = FALSE;
 CREATE INDEX IF NOT EXISTS idx_project_event_cursor ON project ((COALESCE(scheduled_date, due_date)) DESC, id DESC) WHERE is_deleted = FALSE;
 
 CREATE INDEX IF NOT EXISTS idx_project_type_value ON project_type (value);
@@ -740,20 +797,36 @@ CREATE INDEX IF NOT EXISTS idx_msg_mention_user   ON message_mention(user_email)
 CREATE INDEX IF NOT EXISTS idx_magiclink_email    ON magic_link(user_email);
 CREATE INDEX IF NOT EXISTS idx_jwt_user           ON jwt_token(user_email);
 CREATE INDEX IF NOT EXISTS idx_casbin_subject_dom ON casbin_rule(v0, v1);
+CREATE INDEX IF NOT EXISTS idx_casbin_role_subject ON casbin_rule(v1, v0) WHERE ptype = 'g';
 CREATE INDEX IF NOT EXISTS idx_notification_cursor ON notification (created_at DESC, id DESC);
 CREATE INDEX IF NOT EXISTS idx_status_proj_category_value ON status (category, value);
 CREATE INDEX IF NOT EXISTS idx_project_trade_value ON project_trade (value);
 CREATE INDEX IF NOT EXISTS idx_pay_term_value ON pay_term (value);
-CREATE INDEX IF NOT EXISTS idx_message_project_created_at ON message(project_id, created_at DESC) WHERE is_deleted = FALSE;
-CREATE INDEX IF NOT EXISTS idx_quote_project_created_at ON quote(project_id, created_at DESC) WHERE is_deleted = FALSE;
-CREATE INDEX IF NOT EXISTS idx_document_project_created_at ON document(project_id, created_at DESC) WHERE is_deleted = FALSE;
 CREATE INDEX IF NOT EXISTS idx_client_cursor ON client (created_at DESC, id DESC) WHERE is_deleted = FALSE;
-CREATE INDEX IF NOT EXISTS idx_invoice_client_created_at ON invoice(client_id, created_at DESC) WHERE is_deleted = FALSE;
-CREATE INDEX IF NOT EXISTS idx_document_client_created_at ON document(client_id, created_at DESC) WHERE is_deleted = FALSE;
-CREATE INDEX IF NOT EXISTS idx_project_client_created_at ON project(client_id, created_at DESC) WHERE is_deleted = FALSE;
-
-
--- GIN indexes on search_text
+CREATE INDEX IF NOT EXISTS idx_invoice_cursor ON invoice (created_at DESC, id DESC) WHERE is_deleted = FALSE;
+
+--- keyset indexes: parent filter first, then the full (created_at, id) sort key
+DROP INDEX IF EXISTS idx_message_project_created_at;
+DROP INDEX IF EXISTS idx_quote_project_created_at;
+DROP INDEX IF EXISTS idx_document_project_created_at;
+DROP INDEX IF EXISTS idx_invoice_client_created_at;
+DROP INDEX IF EXISTS idx_document_client_created_at;
+DROP INDEX IF EXISTS idx_project_client_created_at;
+CREATE INDEX IF NOT EXISTS idx_message_project_cursor ON message (project_id, created_at DESC, id DESC) WHERE is_deleted = FALSE;
+CREATE INDEX IF NOT EXISTS idx_quote_project_cursor ON quote (project_id, created_at DESC, id DESC) WHERE is_deleted = FALSE;
+--- the document and client-invoice listings read only these columns, so the
+--- INCLUDE lists let their pages come from index-only scans
+DROP INDEX IF EXISTS idx_document_project_cursor;
+DROP INDEX IF EXISTS idx_document_client_cursor;
+DROP INDEX IF EXISTS idx_invoice_client_cursor;
+CREATE INDEX IF NOT EXISTS idx_document_project_listing ON document (project_id, created_at DESC, id DESC) INCLUDE (file_name, file_extension, document_type) WHERE is_deleted = FALSE;
+CREATE INDEX IF NOT EXISTS idx_document_client_listing ON document (client_id, purpose, created_at DESC, id DESC) INCLUDE (file_name, file_extension, document_type) WHERE is_deleted = FALSE;
+CREATE INDEX IF NOT EXISTS idx_invoice_client_listing ON invoice (client_id, created_at DESC, id DESC) INCLUDE (number, issuance_date, amount, status_id) WHERE is_deleted = FALSE;
+CREATE INDEX IF NOT EXISTS idx_project_client_cursor ON project (client_id, created_at DESC, id DESC) WHERE is_deleted = FALSE;
+CREATE INDEX IF NOT EXISTS idx_client_password_cursor ON client_password (client_id, created_at DESC, user_id DESC);
+
+
+--- GIN indexes on search_text
 CREATE INDEX IF NOT EXISTS idx_project_search_text   ON project   USING GIN (search_text gin_trgm_ops) WHERE is_deleted = FALSE;
 CREATE INDEX IF NOT EXISTS idx_client_search_text    ON client    USING GIN (search_text gin_trgm_ops) WHERE is_deleted = FALSE;
 CREATE INDEX IF NOT EXISTS idx_document_search_text  ON document  USING GIN (search_text gin_trgm_ops) WHERE is_deleted = FALSE;
@@ -915,6 +988,28 @@ CREATE TRIGGER trg_message_refresh_search_text
 """
 
 
+# Grants found missing when the seeded policies were audited against the routes
+# before Casbin denials were enforced, plus grants for routes added after the
+# seed was first written. The seed above only runs on an empty casbin_rule, so
+# these are applied on every start (once each) to reach existing databases too;
+# a new non-admin route belongs both here and in the seed.
+# client_technician inherits client_admin's grants.
+POLICY_GRANTS = [
+    ("employee_account_manager", "/get-mention-users"),
+    ("employee_account_manager", "/get-client-types"),
+    ("employee_account_manager", "/auth/revoke"),
+    ("employee_account_manager", "/auth/get-recovery-params"),
+    ("employee_account_manager", "/auth/update-client-key"),
+    ("employee_account_manager", "/fetch-project-bundle"),
+    ("employee_account_manager", "/bootstrap"),
+    ("client_admin", "/get-mention-users"),
+    ("client_admin", "/auth/revoke"),
+    ("client_admin", "/auth/get-recovery-params"),
+    ("client_admin", "/auth/update-client-key"),
+    ("client_admin", "/fetch-project-bundle"),
+]
+
+
 def preprocess_sql(sql: str) -> str:
     return "\n".join(line for line in sql.splitlines() if not re.match(r'^\s*-{3,}', line))
 
@@ -986,6 +1081,7 @@ async def create_tables():
             ("insurance", INSURANCE),
             ("notification", NOTIFICATION),
             ("notification_listen_notify", NOTIFICATION_LISTEN_NOTIFY),
+            ("lookup_listen_notify", LOOKUP_LISTEN_NOTIFY),
             ("views", VIEWS),
             ("prepares", PREPARES),
             ("indices", INDICES),
@@ -1015,13 +1111,15 @@ async def create_tables():
                     ("p", "employee_account_manager", "*", "/get-project-statuses", "*"),
                     ("p", "employee_account_manager", "*", "/get-project-types", "*"),
                     ("p", "employee_account_manager", "*", "/get-project-trades", "*"),
+                    ("p", "employee_account_manager", "*", "/bootstrap", "*"),
                     ("p", "employee_account_manager", "*", "/get-project-priorities", "*"),
-                    ("p", "employee_account_manager", "*", "/get-project-assessments", "*"),
+                    ("p", "employee_account_manager", "*", "/project-assessments", "*"),
                     ("p", "employee_account_manager", "*", "/get-states", "*"),
                     ("p", "employee_account_manager", "*", "/create-new-project", "*"),
                     ("p", "employee_account_manager", "*", "/get-project", "*"),
                     ("p", "employee_account_manager", "*", "/fetch-project-quotes", "*"),
                     ("p", "employee_account_manager", "*", "/fetch-project-documents", "*"),
+                    ("p", "employee_account_manager", "*", "/fetch-project-bundle", "*"),
                     ("p", "employee_account_manager", "*", "/get-clients", "*"),
                     ("p", "employee_account_manager", "*", "/get-pay-terms", "*"),
                     ("p", "employee_account_manager", "*", "/create-new-client", "*"),
@@ -1055,6 +1153,7 @@ async def create_tables():
                     ("p", "client_admin", "*", "/get-project", "*"),
                     ("p", "client_admin", "*", "/fetch-project-quotes", "*"),
                     ("p", "client_admin", "*", "/fetch-project-documents", "*"),
+                    ("p", "client_admin", "*", "/fetch-project-bundle", "*"),
                     ("p", "client_admin", "*", "/fetch-client", "*"),
                     ("p", "client_admin", "*", "/fetch-client-invoices", "*"),
                     ("p", "client_admin", "*", "/fetch-client-onboarding-documents", "*"),
@@ -1078,6 +1177,7 @@ async def create_tables():
                     ("p", "client_technician", "*", "/get-project", "*"),
                     ("p", "client_technician", "*", "/fetch-project-quotes", "*"),
                     ("p", "client_technician", "*", "/fetch-project-documents", "*"),
+                    ("p", "client_technician", "*", "/fetch-project-bundle", "*"),
                     ("p", "client_technician", "*", "/fetch-client", "*"),
                     ("p", "client_technician", "*", "/fetch-client-invoices", "*"),
                     ("p", "client_technician", "*", "/fetch-client-onboarding-documents", "*"),
@@ -1098,6 +1198,19 @@ async def create_tables():
                 ]
             )
 
+        # the route was always /project-assessments; older seeds had the wrong path
+        await conn.execute(
+            "UPDATE casbin_rule SET v2='/project-assessments' WHERE ptype='p' AND v2='/get-project-assessments'"
+        )
+        await conn.executemany(
+            """
+            INSERT INTO casbin_rule (ptype, v0, v1, v2, v3)
+            SELECT 'p', $1::text, '*', $2::text, '*'
+            WHERE NOT EXISTS (SELECT 1 FROM casbin_rule WHERE ptype='p' AND v0=$1::text AND v2=$2::text);
+            """,
+            POLICY_GRANTS,
+        )
+
         if await conn.fetchval("SELECT count(*) FROM state") == 0:
             await conn.executemany(
                 "INSERT INTO state (name) VALUES ($1) ON CONFLICT DO NOTHING;",
@@ -1,12 +1,18 @@
 # LoadBalancer.py
 import asyncio
-import json
+import heapq
+import itertools
 import logging
+import logging.handlers
+import queue
+import os
+import random
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator
 
 import aiofiles
 import httpx
+import orjson
 import uvicorn
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.responses import StreamingResponse
@@ -14,6 +20,16 @@ from pydantic import BaseModel
 from starlette.background import BackgroundTask
 
 BACKENDS_FILE = "backends.json"
+BACKENDS_FLUSH_INTERVAL = 1.0
+RETRY_BASE_DELAY = 0.1
+RETRY_MAX_DELAY = 2.0
+STREAM_CHUNK_SIZE = 256 * 1024
+# Hop-by-hop headers (RFC 7230 §6.1) plus content-length, which no longer
+# applies once the body is re-streamed
+HOP_BY_HOP = frozenset({
+    b"connection", b"keep-alive", b"proxy-authenticate", b"proxy-authorization",
+    b"te", b"trailer", b"transfer-encoding", b"upgrade", b"content-length",
+})
 
 class Server(BaseModel):
     url: str
@@ -25,104 +41,191 @@ formatter = logging.Formatter(
 )
 handler = logging.StreamHandler()
 handler.setFormatter(formatter)
+# Request handlers only enqueue records; a listener thread does the stderr writes
+log_queue: queue.SimpleQueue = queue.SimpleQueue()
+log_listener = logging.handlers.QueueListener(log_queue, handler)
+log_listener.start()
 logger = logging.getLogger("loadbalancer")
-logger.addHandler(handler)
+logger.addHandler(logging.handlers.QueueHandler(log_queue))
 logger.setLevel(logging.INFO)
 
 # ——— In-memory state ———
+# All state is only touched from the event loop thread, so no lock is needed.
+# `backends` and `health_status` are copy-on-write: writers build a new object
+# and rebind the module-level name, readers just grab the current reference.
 backends: list[str] = []
 queue_counts: dict[str, int] = {}
 health_status: dict[str, bool] = {}
-lock = asyncio.Lock()
-client = httpx.AsyncClient(timeout=None)
+client = httpx.AsyncClient(
+    limits=httpx.Limits(max_connections=1000, max_keepalive_connections=500, keepalive_expiry=30.0),
+    timeout=httpx.Timeout(connect=2.0, read=None, write=None, pool=5.0),
+)
+# Separate small pool so health probes never queue behind proxy traffic
+health_client = httpx.AsyncClient(limits=httpx.Limits(max_connections=20), timeout=2.0)
+
+# Lazy min-heap of (queue_count, seq, url). Counter changes push a fresh entry
+# instead of updating in place; entries whose count no longer matches
+# queue_counts, or whose backend is unhealthy, are dropped when they surface.
+load_heap: list[tuple[int, int, str]] = []
+heap_seq = itertools.count()
+
+# ——— Backend Selection ———
+def rebuild_heap() -> None:
+    global load_heap
+    load_heap = [(queue_counts[u], next(heap_seq), u) for u in backends if health_status.get(u)]
+    heapq.heapify(load_heap)
+
+def push_backend(url: str) -> None:
+    heapq.heappush(load_heap, (queue_counts[url], next(heap_seq), url))
+    # Stale entries only disappear when they reach the top; compact if they pile up
+    if len(load_heap) > 4 * len(queue_counts) + 16:
+        rebuild_heap()
+
+def acquire_backend() -> str | None:
+    while load_heap:
+        count, _, url = load_heap[0]
+        if queue_counts.get(url) != count or not health_status.get(url):
+            heapq.heappop(load_heap)
+            continue
+        queue_counts[url] = count + 1
+        heapq.heapreplace(load_heap, (count + 1, next(heap_seq), url))
+        return url
+    return None
+
+def mark_unhealthy(url: str) -> None:
+    global health_status
+    if health_status.get(url):
+        health_status = {**health_status, url: False}
+
+def release_backend(url: str) -> None:
+    if url in queue_counts:
+        queue_counts[url] -= 1
+        if health_status.get(url):
+            push_backend(url)
 
 # ——— Persistence Helpers ———
 async def load_backends() -> list[str]:
     try:
         async with aiofiles.open(BACKENDS_FILE, "r") as f:
             data = await f.read()
-            return json.loads(data).get("backends", [])
+            return orjson.loads(data).get("backends", [])
     except Exception as e:
-        logger.warning(f"Could not load backends file: {e}")
+        logger.warning("Could not load backends file: %s", e)
         return []
 
 async def save_backends(backends: list[str]) -> None:
-    async with aiofiles.open(BACKENDS_FILE, "w") as f:
-        await f.write(json.dumps({"backends": backends}, indent=2))
-    logger.info(f"Persisted backends: {backends}")
+    # Write a temp file and swap it in so a crash never leaves a torn file
+    tmp = f"{BACKENDS_FILE}.tmp"
+    async with aiofiles.open(tmp, "wb") as f:
+        await f.write(orjson.dumps({"backends": backends}))
+    os.replace(tmp, BACKENDS_FILE)
+    logger.info("Persisted backends: %s", backends)
+
+# Management endpoints only flag the list as dirty; this loop coalesces bursts
+# of changes into at most one write per BACKENDS_FLUSH_INTERVAL.
+backends_dirty = asyncio.Event()
+persisted_backends: list[str] = []
+
+async def flush_backends() -> None:
+    global persisted_backends
+    backends_dirty.clear()
+    if backends != persisted_backends:
+        snapshot = backends
+        await save_backends(snapshot)
+        persisted_backends = snapshot
+
+async def flush_backends_loop() -> None:
+    while True:
+        await backends_dirty.wait()
+        await asyncio.sleep(BACKENDS_FLUSH_INTERVAL)
+        await flush_backends()
 
 # ——— Periodic Health-Check ———
+async def probe(url: str) -> bool:
+    try:
+        resp = await health_client.get(f"{url}/connection-test")
+        return resp.status_code == 200
+    except Exception as e:
+        logger.debug("Health check failed for %s: %s", url, e)
+        return False
+
 async def health_check_loop() -> None:
+    global health_status
     while True:
-        async with lock:
-            targets = list(backends)
-        for url in targets:
-            try:
-                resp = await client.get(f"{url}/connection-test", timeout=2.0)
-                ok = resp.status_code == 200
-            except Exception as e:
-                ok = False
-                logger.debug(f"Health check failed for {url}: {e}")
-            async with lock:
-                health_status[url] = ok
+        targets = backends
+        results = await asyncio.gather(*(probe(url) for url in targets))
+        updated = dict(health_status)
+        recovered = []
+        for url, ok in zip(targets, results):
+            if url in queue_counts and updated.get(url) != ok:
+                updated[url] = ok
+                if ok:
+                    recovered.append(url)
+        health_status = updated
+        for url in recovered:
+            push_backend(url)
         await asyncio.sleep(5)
 
 # ——— Application Lifespan ———
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
-    loaded = await load_backends()
-    backends.extend(loaded)
+    global backends, health_status, persisted_backends
+    backends = await load_backends()
+    persisted_backends = backends
     for url in backends:
         queue_counts[url] = 0
-        health_status[url] = False
+    health_status = {url: False for url in backends}
 
-    logger.info(f"Starting health check for backends: {backends}")
+    logger.info("Starting health check for backends: %s", backends)
     health_task = asyncio.create_task(health_check_loop())
+    flush_task = asyncio.create_task(flush_backends_loop())
 
     yield  # ← app runs here
 
-    logger.info("Shutting down health check task and HTTP client")
-    health_task.cancel()
-    try:
-        await health_task
-    except asyncio.CancelledError:
-        pass
+    logger.info("Shutting down background tasks and HTTP clients")
+    for task in (health_task, flush_task):
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    await flush_backends()
     await client.aclose()
+    await health_client.aclose()
+    log_listener.stop()
 
 app = FastAPI(lifespan=lifespan)
 
 # ——— Management Endpoints ———
 @app.post("/servers")
 async def add_server(server: Server):
-    async with lock:
-        if server.url not in queue_counts:
-            backends.append(server.url)
-            queue_counts[server.url] = 0
-            health_status[server.url] = False
-            await save_backends(backends)
-            logger.info(f"Added backend: {server.url}")
+    global backends, health_status
+    if server.url not in queue_counts:
+        queue_counts[server.url] = 0
+        health_status = {**health_status, server.url: False}
+        backends = [*backends, server.url]
+        backends_dirty.set()
+        logger.info("Added backend: %s", server.url)
     return {"servers": backends}
 
 @app.delete("/servers")
 async def remove_server(server: Server):
-    async with lock:
-        if server.url in queue_counts:
-            backends.remove(server.url)
-            queue_counts.pop(server.url, None)
-            health_status.pop(server.url, None)
-            await save_backends(backends)
-            logger.info(f"Removed backend: {server.url}")
+    global backends, health_status
+    if server.url in queue_counts:
+        backends = [u for u in backends if u != server.url]
+        health_status = {u: ok for u, ok in health_status.items() if u != server.url}
+        queue_counts.pop(server.url, None)
+        backends_dirty.set()
+        logger.info("Removed backend: %s", server.url)
     return {"servers": backends}
 
 @app.get("/servers")
 async def list_servers():
-    async with lock:
-        return {"servers": backends}
+    return {"servers": backends}
 
 @app.get("/queue-lengths")
 async def list_queue_lengths():
-    async with lock:
-        return {"queue_lengths": queue_counts, "health": health_status}
+    return {"queue_lengths": queue_counts, "health": health_status}
 
 # ——— Load-Balancer Middleware ———
 @app.middleware("http")
@@ -134,56 +237,68 @@ async def load_balancer(request: Request, call_next):
     if path.startswith("/servers") or path == "/queue-lengths":
         return await call_next(request)
 
-    # 2) Pick least-loaded healthy backend
-    async with lock:
-        available = [u for u in backends if health_status.get(u)]
-        if not available:
-            logger.error(f"{client_ip} -> No available backends for {path}")
-            raise HTTPException(status_code=503, detail="No available backends")
-        target = min(available, key=lambda u: queue_counts[u])
-        queue_counts[target] += 1
-
-    logger.info(f"{client_ip} -> {request.method} {path} ➔ {target}")
-
-    # 3) Construct upstream URL properly
+    # 2) Construct upstream path and headers once for all attempts
     qs = request.url.query
-    upstream_url = target + path + (f"?{qs}" if qs else "")
+    path_qs = f"{path}?{qs}" if qs else path
+    upstream_headers = [(k, v) for k, v in request.headers.raw if k != b"host"]
+    body = await request.body()
 
-    # 4) Proxy with retries and manual stream-manager enter/exit
+    # 3) Proxy with retries and manual stream-manager enter/exit. Each attempt
+    #    picks the least-loaded healthy backend, and a backend that fails is
+    #    marked down so the next attempt fails over to another one.
     max_retries = 3
+    last_error: httpx.RequestError | None = None
     for attempt in range(1, max_retries + 1):
+        if attempt > 1:
+            # Exponential backoff with full jitter
+            delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (attempt - 2))
+            await asyncio.sleep(delay * random.random())
+
+        target = acquire_backend()
+        if target is None:
+            break
+
+        logger.info("%s -> %s %s ➔ %s", client_ip, request.method, path, target)
+        upstream_url = target + path_qs
         try:
             # Create, but don’t “await” the async-context manager
             manager = client.stream(
                 request.method,
                 upstream_url,
-                headers=request.headers.raw,
-                content=await request.body(),
-                timeout=None
+                headers=upstream_headers,
+                content=body,
             )
 
             # Manually enter to get the Response
             resp = await manager.__aenter__()
-            logger.info(f"Response {resp.status_code} from {target} (attempt {attempt})")
+            logger.info("Response %s from %s (attempt %s)", resp.status_code, target, attempt)
 
             # Return a StreamingResponse that will close the manager in background
-            return StreamingResponse(
-                resp.aiter_bytes(),
+            response = StreamingResponse(
+                resp.aiter_raw(chunk_size=STREAM_CHUNK_SIZE),
                 status_code=resp.status_code,
-                headers=resp.headers,
                 background=BackgroundTask(manager.__aexit__, None, None, None)
             )
+            # Copy raw pairs so repeated headers such as set-cookie survive
+            response.raw_headers = [
+                (k, v) for k, v in ((k.lower(), v) for k, v in resp.headers.raw) if k not in HOP_BY_HOP
+            ]
+            return response
 
         except httpx.RequestError as e:
-            logger.warning(f"Attempt {attempt} to {upstream_url} failed: {e}")
-            if attempt == max_retries:
-                logger.error(f"All {max_retries} attempts failed for {client_ip} -> {path}")
-                raise HTTPException(status_code=502, detail=str(e))
-            await asyncio.sleep(1)
+            last_error = e
+            logger.warning("Attempt %s to %s failed: %s", attempt, upstream_url, e)
+            mark_unhealthy(target)
 
         finally:
-            async with lock:
-                queue_counts[target] -= 1
+            release_backend(target)
+
+    if last_error is None:
+        logger.error("%s -> No available backends for %s", client_ip, path)
+        raise HTTPException(status_code=503, detail="No available backends")
+    logger.error("All attempts failed for %s -> %s", client_ip, path)
+    raise HTTPException(status_code=502, detail=str(last_error))
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8100, log_level="info")
+    # Single worker on purpose: queue counts and health state live in this process
+    uvicorn.run(app, host="0.0.0.0", port=8100, log_level="info", loop="uvloop", http="httptools")
@@ -1,10 +1,14 @@
 import asyncio
 import base64
+import hashlib
 import json
 import os
 import random
+import struct
+import time
+from collections import OrderedDict
 from contextlib import asynccontextmanager
-from datetime import datetime, timezone, timedelta
+from datetime import date, datetime, timezone, timedelta
 from decimal import Decimal
 from typing import Optional
 from uuid import UUID, uuid4
@@ -12,21 +16,23 @@ from uuid import UUID, uuid4
 import httpx
 import jwt
 import nacl.bindings
+import orjson
 import uvicorn
-from asyncpg import create_pool, Pool, Connection
+from asyncpg import connect, create_pool, Pool, Connection, Record
+from asyncpg.prepared_stmt import PreparedStatement
 from casbin import AsyncEnforcer
 from casbin_async_sqlalchemy_adapter import Adapter
 from casbin_redis_watcher import new_watcher, WatcherOptions
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from fastapi import FastAPI, HTTPException, Query, Body, Request, Depends, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse, Response
 from redis.asyncio import Redis
 from sqlalchemy import Column, Integer, String
 from sqlalchemy.ext.asyncio import create_async_engine
 from sqlalchemy.orm import declarative_base
 
-from constants import ASYNCPG_URL, SECRET_KEY, REDIS_URL, KMS_URL, BYPASS_ONBOARDING_CHECKS, BYPASS_SESSION
+from constants import ASYNCPG_URL, POOLED_DB_URL, DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE, SECRET_KEY, REDIS_URL, KMS_URL, BYPASS_ONBOARDING_CHECKS, BYPASS_SESSION
 from util import isUUIDv4, createMagicLink, generateJwtRs256, decodeJwtRs256
 
 
@@ -42,22 +48,533 @@ class SimpleUser:
         self.is_client = is_client
 
 
+class CrmConnection(Connection):
+    """asyncpg connection that keeps the hot endpoints' statements prepared."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.preparedStatements: dict[str, PreparedStatement] = {}
+
+    async def prepared(self, sql: str) -> PreparedStatement:
+        stmt = self.preparedStatements.get(sql)
+        if stmt is None:
+            stmt = await self.prepare(sql)
+            self.preparedStatements[sql] = stmt
+        return stmt
+
+
+CURRENT_USER_SQL = (
+    "SELECT id, first_name, last_name, has_set_recovery_phrase, onboarding_done, is_client FROM \"user\" WHERE email=$1"
+)
+USER_KEY_SQL = "SELECT public_key FROM user_key WHERE user_email=$1 AND purpose='sig'"
+
+# Statements hit on nearly every request, prepared as soon as a connection opens
+WARM_STATEMENTS = [CURRENT_USER_SQL, USER_KEY_SQL]
+
+
+async def warmConnection(conn: CrmConnection):
+    for sql in WARM_STATEMENTS:
+        await conn.prepared(sql)
+
+
+async def estimateRowCount(conn: CrmConnection, table: str) -> int:
+    stmt = await conn.prepared("SELECT GREATEST(reltuples, 0)::bigint FROM pg_class WHERE oid = $1::regclass")
+    return await stmt.fetchval(table) or 0
+
+
+MAX_UUID = UUID("ffffffff-ffff-ffff-ffff-ffffffffffff")
+
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+CURSOR_FORMAT = struct.Struct(">q16s")
+
+
+# Opaque page token: microseconds since epoch + the 16 uuid bytes, base64url
+def encodeCursor(ts: datetime, rowId: UUID) -> str:
+    micros = (ts - EPOCH) // timedelta(microseconds=1)
+    return base64.urlsafe_b64encode(CURSOR_FORMAT.pack(micros, rowId.bytes)).decode()
+
+
+def decodeCursor(token: str) -> tuple[datetime, UUID]:
+    try:
+        micros, idBytes = CURSOR_FORMAT.unpack(base64.urlsafe_b64decode(token))
+    except (ValueError, struct.error):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return EPOCH + timedelta(microseconds=micros), UUID(bytes=idBytes)
+
+
+# Keyset cursor for (created_at, id) DESC pages; no cursor starts from now.
+# The opaque `cursor` token wins over the legacy last_seen_* pair. Query
+# string cursors arrive already parsed by FastAPI; body values are strings.
+def parseCursor(lastSeenCreatedAt: datetime | str | None, lastSeenId, cursor: str | None = None) -> tuple[datetime, UUID]:
+    if cursor:
+        return decodeCursor(cursor)
+    if lastSeenCreatedAt:
+        if isinstance(lastSeenCreatedAt, datetime):
+            dt = lastSeenCreatedAt
+        else:
+            try:
+                dt = datetime.fromisoformat(lastSeenCreatedAt)
+            except ValueError:
+                raise HTTPException(status_code=400, detail=f"Invalid timestamp: '{lastSeenCreatedAt}'")
+        cursorTs = dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+    else:
+        cursorTs = datetime.now(timezone.utc)
+    if not lastSeenId:
+        return cursorTs, MAX_UUID
+    if isinstance(lastSeenId, UUID):
+        return cursorTs, lastSeenId
+    try:
+        return cursorTs, UUID(lastSeenId)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail=f"Invalid id: '{lastSeenId}'")
+
+
+# Exact counts for filtered pages, shared by every page of the same listing
+# instead of a COUNT(*) OVER() that rescanned all matching rows per page.
+COUNT_CACHE_TTL = 30
+countCache: dict[tuple, tuple[float, int]] = {}
+
+
+async def cachedCount(conn: CrmConnection, sql: str, *args) -> int:
+    key = (sql, *args)
+    now = time.monotonic()
+    hit = countCache.get(key)
+    if hit and hit[0] > now:
+        return hit[1]
+    if len(countCache) > 10000:
+        for k in [k for k, v in countCache.items() if v[0] <= now]:
+            del countCache[k]
+    stmt = await conn.prepared(sql)
+    total = await stmt.fetchval(*args) or 0
+    countCache[key] = (now + COUNT_CACHE_TTL, total)
+    return total
+
+
+def jsonDefault(o):
+    if isinstance(o, Record):
+        return dict(o)
+    # asyncpg decodes uuid columns into its own C UUID subclass, which
+    # orjson only serializes when the type is exactly uuid.UUID
+    if isinstance(o, UUID):
+        return str(o)
+    if isinstance(o, Decimal):
+        return float(o)
+    raise TypeError(f"Object of type {o.__class__.__name__} is not JSON serializable")
+
+
+# Small, rarely-changing lookup tables. Keys are "<table>" or "<table>:<category>"
+# so admin writes can drop everything cached for the table they touched.
+LOOKUP_CACHE_TTL = 60
+LOOKUP_SQL = {
+    "status:project": "SELECT id, value, color FROM status WHERE category = 'project' ORDER BY value",
+    "status:client": "SELECT id, value, color FROM status WHERE category = 'client' ORDER BY value",
+    "status:billing": "SELECT id, value, color FROM status WHERE category = 'billing' ORDER BY value",
+    "status:invoice": "SELECT id, value, color FROM status WHERE category = 'invoice' ORDER BY value",
+    "status:quote": "SELECT id, value, color FROM status WHERE category = 'quote' ORDER BY value",
+    "project_type": "SELECT id, value FROM project_type ORDER BY value",
+    "project_trade": "SELECT id, value FROM project_trade ORDER BY value",
+    "project_priority": "SELECT id, value, color FROM project_priority ORDER BY value",
+    "client_type": "SELECT id, value FROM client_type ORDER BY value",
+    "state": "SELECT id, name FROM state ORDER BY name",
+    "pay_term": "SELECT id, value FROM pay_term ORDER BY value",
+    # a view over most tables, so no NOTIFY reaches it; it only ages out
+    "overall_aggregates": "SELECT * FROM overall_aggregates",
+}
+LOOKUP_TTL_OVERRIDES = {"overall_aggregates": 30}
+lookupCache: dict[str, tuple[float, list[Record], dict[UUID, Record], str, bytes]] = {}
+lookupLocks: dict[str, asyncio.Lock] = {}
+
+
+async def loadLookup(conn: Connection, key: str) -> tuple[list[Record], dict[UUID, Record], str, bytes]:
+    hit = lookupCache.get(key)
+    if hit and hit[0] > time.monotonic():
+        return hit[1:]
+    # one loader per key; concurrent misses wait for it instead of all querying
+    async with lookupLocks.setdefault(key, asyncio.Lock()):
+        hit = lookupCache.get(key)
+        if hit and hit[0] > time.monotonic():
+            return hit[1:]
+        rows = await conn.fetch(LOOKUP_SQL[key])
+        byId = {r["id"]: r for r in rows} if rows and "id" in rows[0].keys() else {}
+        # serialized once per load: hashed for the ETag, then reused as the body
+        body = orjson.dumps(rows, default=jsonDefault)
+        etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+        ttl = LOOKUP_TTL_OVERRIDES.get(key, LOOKUP_CACHE_TTL)
+        lookupCache[key] = (time.monotonic() + ttl, rows, byId, etag, body)
+        return rows, byId, etag, body
+
+
+async def cachedFetch(conn: Connection, key: str) -> list[Record]:
+    return (await loadLookup(conn, key))[0]
+
+
+async def cachedLookup(conn: Connection, key: str) -> dict[UUID, Record]:
+    return (await loadLookup(conn, key))[1]
+
+
+# Reference data is encrypted per user and fetched by POST, so the client has
+# to send If-None-Match itself; a match skips serialization and encryption.
+LOOKUP_CACHE_CONTROL = "private, max-age=60, stale-while-revalidate=300"
+
+
+def notModified(request: Request, response: Response, etag: str) -> Response | None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = LOOKUP_CACHE_CONTROL
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": LOOKUP_CACHE_CONTROL})
+    return None
+
+
+async def lookupPayload(field: str, rows: list[Record], body: bytes, user: SimpleUser | None, conn: Connection,
+                        app: FastAPI):
+    if not user:
+        return {field: rows}
+    return await encryptForUser(b'{"%s":%s}' % (field.encode(), body), user.email, conn, app)
+
+
+def invalidateLookups(table: str):
+    for key in [k for k in lookupCache if k.split(":", 1)[0] == table]:
+        lookupCache.pop(key, None)
+
+
+async def preloadLookups(conn: Connection):
+    for key in LOOKUP_SQL:
+        await loadLookup(conn, key)
+
+
+# Every paginated listing is a (created_at, id) DESC keyset walk over one
+# table; the specs below describe them and the SQL is generated once here.
+class KeysetSpec:
+    def __init__(self, table: str, alias: str, columns: str, joins: str = "", filters: tuple[str, ...] = (),
+                 params: int = 0, groupBy: str = "", orderCols: tuple[str, str] = ("created_at", "id"),
+                 cursorKeys: tuple[str, str] = ("created_at", "id"), countJoins: bool = True,
+                 estimateTotal: bool = False, hydrate: tuple[str, str] | None = None):
+        self.table = table
+        self.alias = alias
+        self.columns = columns
+        self.joins = joins
+        self.filters = filters
+        # filters reference $1..$params; the cursor pair and the limit follow
+        self.params = params
+        self.groupBy = groupBy
+        self.orderCols = orderCols
+        self.cursorKeys = cursorKeys
+        self.countJoins = countJoins
+        # unfiltered listings report the planner's row estimate instead of counting
+        self.estimateTotal = estimateTotal
+        # (fk column, "... WHERE id = ANY($1::uuid[])") resolved once per page instead of joined per row
+        self.hydrate = hydrate
+
+
+def buildKeysetSql(spec: KeysetSpec) -> tuple[str, str | None]:
+    source = f'{spec.table} {spec.alias} {spec.joins}'.strip()
+    tsCol, idCol = (f"{spec.alias}.{col}" for col in spec.orderCols)
+    n = spec.params
+    # no casts on the cursor pair: the row comparison types the parameters and
+    # asyncpg binds the datetime / UUID in binary
+    where = list(spec.filters) + [f"({tsCol}, {idCol}) < (${n + 1}, ${n + 2})"]
+    pageSql = (
+        f"SELECT {spec.columns} FROM {source} WHERE {' AND '.join(where)}"
+        + (f" GROUP BY {spec.groupBy}" if spec.groupBy else "")
+        + f" ORDER BY {tsCol} DESC, {idCol} DESC LIMIT ${n + 3}"
+    )
+    if spec.estimateTotal:
+        return pageSql, None
+    countSource = source if spec.countJoins else f"{spec.table} {spec.alias}"
+    countSql = f"SELECT count(*) FROM {countSource}"
+    if spec.filters:
+        countSql += f" WHERE {' AND '.join(spec.filters)}"
+    return pageSql, countSql
+
+
+SENDERS_SQL = (
+    'SELECT id, email AS sender_email, first_name AS sender_first_name, last_name AS sender_last_name '
+    'FROM "user" WHERE id = ANY($1::uuid[])'
+)
+
+DOCUMENT_COLUMNS = """
+  d.id             AS document_id,
+  d.file_name      AS title,
+  d.file_extension AS type,
+  d.document_type  AS document_type,
+  d.created_at     AS date_uploaded
+"""
+
+KEYSET_SPECS = {
+    "notifications": KeysetSpec(
+        "notification", "n",
+        "n.id, n.triggered_by_category, n.triggered_by_user, n.content, n.created_at",
+        estimateTotal=True,
+    ),
+    # the long free-text columns and search_text are left to /get-project
+    "projects": KeysetSpec(
+        "project", "p",
+        """
+  p.id, p.business_name, p.client_id, p.priority_id, p.type_id, p.trade_id,
+  p.status_id, p.assignee_id, p.address, p.city, p.state_id, p.zip_code, p.nte,
+  p.date_received, p.due_date, p.scheduled_date, p.created_at,
+  c.company_name,
+  s.value AS status_value
+""",
+        joins="JOIN client c ON c.id = p.client_id JOIN status s ON s.id = p.status_id AND s.category = 'project'",
+        filters=("p.is_deleted = FALSE",),
+        estimateTotal=True,
+    ),
+    "messages": KeysetSpec(
+        "message", "m",
+        """
+  m.id, m.created_at, m.updated_at, m.content, m.sender_id, m.sender_role,
+  CASE WHEN m.has_mentions
+       THEN ARRAY(SELECT mm.user_email FROM message_mention mm WHERE mm.message_id = m.id)
+       ELSE '{}'
+  END AS mentions,
+  m.file_attachment_id
+""",
+        filters=("m.project_id = $1", "m.is_deleted = FALSE"),
+        params=1,
+        hydrate=("sender_id", SENDERS_SQL),
+    ),
+    "quotes": KeysetSpec(
+        "quote", "q",
+        """
+  q.id                 AS quote_id,
+  q.number             AS number,
+  q.created_at         AS date_created,
+  q.amount             AS amount,
+  s.value              AS status
+""",
+        joins="JOIN status s ON s.id = q.status_id AND s.category = 'quote'",
+        filters=("q.project_id = $1", "q.is_deleted = FALSE"),
+        params=1,
+        cursorKeys=("date_created", "quote_id"),
+    ),
+    "project_documents": KeysetSpec(
+        "document", "d", DOCUMENT_COLUMNS,
+        filters=("d.project_id = $1", "d.is_deleted = FALSE"),
+        params=1,
+        cursorKeys=("date_uploaded", "document_id"),
+    ),
+    "clients": KeysetSpec(
+        "client", "c",
+        """
+  c.id,
+  c.company_name,
+  c.created_at,
+  ct.value AS type_value,
+  c.status_id,
+  s.value AS status_value,
+  COALESCE(ca.total_collected, 0) AS total_revenue
+""",
+        joins=(
+            "JOIN status s ON s.id = c.status_id AND s.category = 'client' "
+            "JOIN client_type ct ON ct.id = c.type_id "
+            "LEFT JOIN client_aggregates ca ON ca.client_id = c.id"
+        ),
+        filters=("c.is_deleted = FALSE",),
+        estimateTotal=True,
+    ),
+    "client_invoices": KeysetSpec(
+        "invoice", "i",
+        """
+  i.id            AS invoice_id,
+  i.number        AS number,
+  i.created_at    AS date_created,
+  i.issuance_date AS issuance_date,
+  i.amount        AS amount,
+  s.value         AS status_value
+""",
+        joins="JOIN status s ON s.id = i.status_id AND s.category = 'invoice'",
+        filters=(
+            "i.client_id = $1", "i.is_deleted = FALSE",
+            "($2::text IS NULL OR i.number::text ILIKE '%' || $2 || '%')",
+        ),
+        params=2,
+        cursorKeys=("date_created", "invoice_id"),
+    ),
+    "onboarding_documents": KeysetSpec(
+        "document", "d", DOCUMENT_COLUMNS,
+        filters=(
+            "d.client_id = $1", "d.purpose = 'onboarding_paperwork'", "d.is_deleted = FALSE",
+            "($2::text IS NULL OR d.file_name ILIKE '%' || $2 || '%')",
+        ),
+        params=2,
+        cursorKeys=("date_uploaded", "document_id"),
+    ),
+    "insurance_documents": KeysetSpec(
+        "document", "d", DOCUMENT_COLUMNS,
+        filters=(
+            "d.client_id = $1", "d.purpose = 'insurance'", "d.is_deleted = FALSE",
+            "($2::text IS NULL OR d.file_name ILIKE '%' || $2 || '%')",
+        ),
+        params=2,
+        cursorKeys=("date_uploaded", "document_id"),
+    ),
+    "client_projects": KeysetSpec(
+        "project", "p",
+        """
+  p.id            AS project_id,
+  p.business_name AS business_name,
+  p.created_at    AS date_created,
+  p.due_date      AS due_date,
+  s.value         AS status_value
+""",
+        joins="JOIN status s ON s.id = p.status_id AND s.category = 'project'",
+        filters=(
+            "p.client_id = $1", "s.value = 'Open'", "p.is_deleted = FALSE",
+            "($2::text IS NULL OR p.business_name ILIKE '%' || $2 || '%')",
+        ),
+        params=2,
+        cursorKeys=("date_created", "project_id"),
+    ),
+    "billings": KeysetSpec(
+        "invoice", "i",
+        """
+  i.id,
+  i.number,
+  i.issuance_date,
+  i.due_date,
+  i.amount,
+  s.value        AS status_value,
+  d.file_url,
+  d.file_name,
+  d.file_extension,
+  d.document_type,
+  i.created_at
+""",
+        joins="JOIN status s ON s.id = i.status_id AND s.category = 'billing' LEFT JOIN document d ON d.id = i.file_id",
+        filters=("i.is_deleted = FALSE",),
+    ),
+    "passwords": KeysetSpec(
+        "client_password", "p",
+        "p.user_id, p.encrypted_password, p.iv, p.salt, p.kdf_params, p.created_at",
+        filters=("p.client_id = $1",),
+        params=1,
+        orderCols=("created_at", "user_id"),
+        cursorKeys=("created_at", "user_id"),
+    ),
+}
+PAGINATED_SQL = {name: buildKeysetSql(spec) for name, spec in KEYSET_SPECS.items()}
+WARM_STATEMENTS.extend(pageSql for pageSql, _ in PAGINATED_SQL.values())
+
+
+async def hydrateRows(conn: CrmConnection, rows: list[Record], fk: str, sql: str) -> list[dict]:
+    stmt = await conn.prepared(sql)
+    related = {r["id"]: r for r in await stmt.fetch(list({row[fk] for row in rows}))}
+    # every row gets every related column (None when unresolved) so all rows
+    # share one shape, which the columnar output relies on
+    keys = [attr.name for attr in stmt.get_attributes() if attr.name != "id"]
+    hydrated = []
+    for row in rows:
+        item = dict(row)
+        match = related.get(row[fk])
+        for k in keys:
+            item[k] = match[k] if match else None
+        hydrated.append(item)
+    return hydrated
+
+
+# Pages are buffered whole so they can be encrypted as one payload, so the
+# size a client may ask for is bounded instead of streamed.
+MAX_PAGE_SIZE = 200
+
+
+# Totals are counted for the first page or when the client asks with
+# include_total; deeper pages reuse the number the client already has.
+def wantsTotal(data: dict, lastSeenCreatedAt: datetime | str | None) -> bool:
+    return bool(data.get("include_total")) or not (data.get("cursor") or lastSeenCreatedAt)
+
+
+async def paginate(conn: CrmConnection, name: str, size: int, cursorTs: datetime, cursorId: UUID, *args,
+                   includeTotal: bool = True, columnar: bool = False) -> dict:
+    spec = KEYSET_SPECS[name]
+    pageSql, countSql = PAGINATED_SQL[name]
+    size = min(size, MAX_PAGE_SIZE)
+    stmt = await conn.prepared(pageSql)
+    rows = await stmt.fetch(*args, cursorTs, cursorId, size)
+    if spec.hydrate and rows:
+        rows = await hydrateRows(conn, rows, *spec.hydrate)
+    if not includeTotal:
+        total = None
+    elif countSql is None:
+        total = await estimateRowCount(conn, spec.table)
+    else:
+        total = await cachedCount(conn, countSql, *args)
+    tsKey, idKey = spec.cursorKeys
+    last = rows[-1] if rows else None
+    page = {}
+    if columnar:
+        # column names once plus one array per row, instead of a keyed object per row
+        page["columns"] = list(rows[0].keys()) if rows else []
+        page["rows"] = [tuple(r.values()) for r in rows]
+    else:
+        page["rows"] = rows
+    return {
+        **page,
+        "total_count": total,
+        "page_size": size,
+        "last_seen_created_at": last[tsKey].isoformat() if last else None,
+        "last_seen_id": str(last[idKey]) if last else None,
+        "next_cursor": encodeCursor(last[tsKey], last[idKey]) if last else None,
+    }
+
+
 def get_db_pool(request: Request) -> Pool:
     return request.app.state.db_pool
 
 
+# authorize (an app-wide dependency) already resolves this through
+# getCurrentUser, and FastAPI caches it per request, so handlers that also
+# depend on it share that one acquisition rather than taking a second one.
 async def get_conn(db_pool: Pool = Depends(get_db_pool)):
     async with db_pool.acquire() as conn:
         yield conn
 
 
+# Verified session claims by raw token, so a browser's repeat requests skip
+# the HMAC and JSON parse; entries never outlive the token's own exp.
+SESSION_CACHE_MAX = 8192
+sessionCache: dict[str, tuple[float, dict]] = {}
+
+
+def decodeSession(token: str) -> dict:
+    hit = sessionCache.get(token)
+    now = time.time()
+    if hit and hit[0] > now:
+        return hit[1]
+    claims = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
+    if len(sessionCache) >= SESSION_CACHE_MAX:
+        for k in [k for k, v in sessionCache.items() if v[0] <= now] or list(sessionCache)[:SESSION_CACHE_MAX // 8]:
+            del sessionCache[k]
+    sessionCache[token] = (claims.get("exp", now), claims)
+    return claims
+
+
+# getCurrentUser's row, cached in Redis so authenticated requests skip the
+# SELECT; the TTL is jittered so keys written together don't expire together.
+# Anything that updates those columns drops the key.
+USER_PROFILE_TTL = 60
+
+
+def userProfileKey(email: str) -> str:
+    return f"user_profile:{email.lower()}"
+
+
+async def invalidateUserProfile(redis: Redis, *emails: str):
+    keys = [userProfileKey(e) for e in emails if e]
+    # DEL with no keys is a Redis error; unknown users leave nothing to drop
+    if not keys:
+        return
+    await redis.delete(*keys)
+
+
 async def getCurrentUser(request: Request, conn: Connection = Depends(get_conn), ) -> SimpleUser | None:
     token = request.cookies.get("session")
 
     if not token:
         return None
     try:
-        data = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
+        data = decodeSession(token)
     except Exception as e:
         print("EXCEPTION: ", e)
         return None
@@ -67,60 +584,107 @@ async def getCurrentUser(request: Request, conn: Connection = Depends(get_conn),
     if not jti or not email:
         return None
     redis = request.app.state.redis
-    if not await redis.sismember("active_jtis", jti):
-        return None
-    if await redis.sismember("blacklisted_users", email):
+    key = userProfileKey(email)
+    # every session check (authorize's revocation one too) and the cached
+    # profile in one round trip
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.sismember("active_jtis", jti)
+        pipe.sismember("blacklisted_users", email)
+        pipe.sismember("blacklisted_jtis", jti)
+        pipe.get(key)
+        active, blacklisted, revoked, cached = await pipe.execute()
+    request.state.session_revoked = bool(revoked)
+    if not active or blacklisted:
         return None
 
-    row = await conn.fetchrow(
-        "SELECT id, first_name, last_name, has_set_recovery_phrase, onboarding_done, is_client FROM \"user\" WHERE email=$1",
+    if cached:
+        profile = orjson.loads(cached)
+    else:
+        stmt = await conn.prepared(CURRENT_USER_SQL)
+        row = await stmt.fetchrow(email)
+        if not row:
+            return None
+        profile = dict(row, id=str(row["id"]))
+        await redis.set(key, orjson.dumps(profile), ex=USER_PROFILE_TTL + random.randint(0, 15))
+    return SimpleUser(
+        UUID(profile["id"]),
         email,
+        profile["first_name"],
+        profile["last_name"],
+        profile["has_set_recovery_phrase"],
+        profile["onboarding_done"],
+        profile["is_client"],
     )
-    if row:
-        return SimpleUser(
-            row["id"],
-            email,
-            row["first_name"],
-            row["last_name"],
-            row["has_set_recovery_phrase"],
-            row["onboarding_done"],
-            row["is_client"],
-        )
-    return None
 
 
 def getEnforcer(request: Request) -> AsyncEnforcer:
     return request.app.state.enforcer
 
 
+# Decisions and role lists only change when the policy is reloaded, so they are
+# memoized (per (sub, obj, act) and per user) and every reload goes through
+# loadPolicy, which drops them.
+ENFORCE_CACHE_MAX = 50000
+enforceCache: OrderedDict[tuple[str, str, str], bool] = OrderedDict()
+rolesCache: dict[str, list[str]] = {}
+
+
+async def loadPolicy(enforcer: AsyncEnforcer):
+    await enforcer.load_policy()
+    enforcer.build_role_links()
+    enforceCache.clear()
+    rolesCache.clear()
+
+
+def enforceCached(enforcer: AsyncEnforcer, sub: str, domain: str, obj: str, act: str) -> bool:
+    key = (sub, obj, act)
+    allowed = enforceCache.get(key)
+    if allowed is not None:
+        enforceCache.move_to_end(key)
+        return allowed
+    # enforce_ex returns (result, explain); the tuple itself is always truthy
+    allowed, _ = enforcer.enforce_ex(sub, domain, obj, act)
+    enforceCache[key] = allowed
+    if len(enforceCache) > ENFORCE_CACHE_MAX:
+        enforceCache.popitem(last=False)
+    return allowed
+
+
+async def userRoles(enforcer: AsyncEnforcer, email: str) -> list[str]:
+    roles = rolesCache.get(email)
+    if roles is None:
+        roles = await enforcer.get_roles_for_user_in_domain(email, "*")
+        if len(rolesCache) >= ENFORCE_CACHE_MAX:
+            rolesCache.clear()
+        rolesCache[email] = roles
+    return roles
+
+
+# Routes reachable without a session; str.startswith checks the whole tuple in one call
+PUBLIC_PREFIXES = (
+    "/auth/ed25519",
+    "/auth/public-key",
+    "/auth/login",
+    "/auth/validate-signup-token",
+    "/auth/validate-login-token",
+    "/auth/me",
+    "/auth/set-recovery-phrase",
+    "/auth/refresh-session",
+    "/connection-test",
+)
+
+
 async def authorize(request: Request, user: SimpleUser = Depends(getCurrentUser),
                     enforcer: AsyncEnforcer = Depends(getEnforcer)):
     path = request.url.path
 
-    if (
-            not BYPASS_SESSION
-            and not path.startswith("/auth/ed25519")
-            and not path.startswith("/auth/public-key")
-            and not path.startswith("/auth/login")
-            and not path.startswith("/auth/validate-signup-token")
-            and not path.startswith("/auth/validate-login-token")
-            and not path.startswith("/auth/me")
-            and not path.startswith("/auth/set-recovery-phrase")
-            and not path.startswith("/auth/refresh-session")
-            and not path.startswith("/connection-test")
-    ):
+    if not BYPASS_SESSION and not path.startswith(PUBLIC_PREFIXES):
         if not user:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="unauthenticated")
 
-        token = request.cookies.get("session")
-        if token:
-            try:
-                data = jwt.decode(token, SECRET_KEY, algorithms=["HS256"], options={"verify_exp": False})
-                jti = data.get("jti")
-                if jti and await request.app.state.redis.sismember("blacklisted_jtis", jti):
-                    raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="revoked")
-            except Exception:
-                pass
+        # getCurrentUser already looked the jti up in blacklisted_jtis
+        if getattr(request.state, "session_revoked", False):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="revoked")
 
         if not user.setup_done and path != "/set-recovery-phrase":
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="set-recovery-phrase")
@@ -134,112 +698,179 @@ async def authorize(request: Request, user: SimpleUser = Depends(getCurrentUser)
         obj = path
         act = request.method.lower()
 
-        allowed = enforcer.enforce_ex(sub, domain, obj, act)
-
-        if not allowed:
+        if not enforceCached(enforcer, sub, domain, obj, act):
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
 
     return True
 
 
-def decryptPayload():
-    async def _dep(payload: dict = Body(), request: Request = None):
-        if "clientPubKey" not in payload:
-            return payload
-        clientPublicKeyB64 = payload.get("clientPubKey")
-        ivB64 = payload.get("nonce")
-        ciphertextB64 = payload.get("ciphertext")
-        if not clientPublicKeyB64 or not ivB64 or not ciphertextB64:
-            raise HTTPException(status_code=400, detail="Invalid payload")
-        try:
-            clientPublicKey = base64.b64decode(clientPublicKeyB64)
-            iv = base64.b64decode(ivB64)
-            ciphertext = base64.b64decode(ciphertextB64)
-        except Exception:
-            raise HTTPException(status_code=400, detail="Bad encoding")
-        serverEdPriv = base64.b64decode(request.app.state.ed25519PrivateKey)
-        serverEdPub = base64.b64decode(request.app.state.ed25519PublicKey)
-        serverEdSecret = serverEdPriv + serverEdPub
-        serverCurvePriv = nacl.bindings.crypto_sign_ed25519_sk_to_curve25519(serverEdSecret)
-        clientCurvePub = nacl.bindings.crypto_sign_ed25519_pk_to_curve25519(clientPublicKey)
-        sharedSecret = nacl.bindings.crypto_scalarmult(serverCurvePriv, clientCurvePub)
-        aesGcm = AESGCM(sharedSecret)
-        try:
+# The server's X25519 key only changes when the KMS rotates the Ed25519 pair,
+# so it is derived then rather than on every encrypted request.
+def serverCurvePrivateKey(edPrivB64: str, edPubB64: str) -> bytes:
+    secret = base64.b64decode(edPrivB64) + base64.b64decode(edPubB64)
+    return nacl.bindings.crypto_sign_ed25519_sk_to_curve25519(secret)
+
+
+# A browser keeps one key pair for its whole session, so the X25519 exchange
+# and the AESGCM built from it are reused per client key (LRU). Cleared
+# whenever the server key rotates.
+CLIENT_CIPHER_CACHE_MAX = 4096
+clientCiphers: OrderedDict[bytes, AESGCM] = OrderedDict()
+
+
+def clientCipher(app: FastAPI, clientPub: bytes) -> AESGCM:
+    aes = clientCiphers.get(clientPub)
+    if aes is not None:
+        clientCiphers.move_to_end(clientPub)
+        return aes
+    clientCurvePub = nacl.bindings.crypto_sign_ed25519_pk_to_curve25519(clientPub)
+    aes = AESGCM(nacl.bindings.crypto_scalarmult(app.state.server_curve_priv, clientCurvePub))
+    clientCiphers[clientPub] = aes
+    if len(clientCiphers) > CLIENT_CIPHER_CACHE_MAX:
+        clientCiphers.popitem(last=False)
+    return aes
+
+
+# Small request bodies decrypt inline; AESGCM over anything bigger (uploads,
+# onboarding forms) goes to the default thread pool so it doesn't hold the loop.
+DECRYPT_OFFLOAD_BYTES = 4096
+
+
+async def decryptPayload(payload: dict = Body(), request: Request = None):
+    if "clientPubKey" not in payload:
+        return payload
+    clientPublicKeyB64 = payload.get("clientPubKey")
+    ivB64 = payload.get("nonce")
+    ciphertextB64 = payload.get("ciphertext")
+    if not clientPublicKeyB64 or not ivB64 or not ciphertextB64:
+        raise HTTPException(status_code=400, detail="Invalid payload")
+    try:
+        clientPublicKey = base64.b64decode(clientPublicKeyB64)
+        iv = base64.b64decode(ivB64)
+        ciphertext = base64.b64decode(ciphertextB64)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Bad encoding")
+    try:
+        aesGcm = clientCipher(request.app, clientPublicKey)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid client key")
+    try:
+        if len(ciphertext) > DECRYPT_OFFLOAD_BYTES:
+            data = await asyncio.to_thread(aesGcm.decrypt, iv, ciphertext, None)
+        else:
             data = aesGcm.decrypt(iv, ciphertext, None)
-        except Exception:
-            raise HTTPException(status_code=400, detail="Decrypt failed")
-        try:
-            payloadObj = json.loads(data.decode())
-            payloadObj["_client_pub"] = clientPublicKey
-            payloadObj["_nonce"] = iv
-            return payloadObj
-        except Exception:
-            raise HTTPException(status_code=400, detail="Invalid data")
-
-    return _dep
-
-
-def encryptForClient(data: dict, client_pub: bytes, app: FastAPI) -> dict:
-    server_priv = base64.b64decode(app.state.ed25519PrivateKey)
-    server_pub = base64.b64decode(app.state.ed25519PublicKey)
-    secret = server_priv + server_pub
-    server_curve_priv = nacl.bindings.crypto_sign_ed25519_sk_to_curve25519(secret)
-    client_curve_pub = nacl.bindings.crypto_sign_ed25519_pk_to_curve25519(client_pub)
-    shared = nacl.bindings.crypto_scalarmult(server_curve_priv, client_curve_pub)
-    aes = AESGCM(shared)
-    iv = os.urandom(12)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Decrypt failed")
+    try:
+        payloadObj = orjson.loads(data)
+        payloadObj["_client_pub"] = clientPublicKey
+        payloadObj["_nonce"] = iv
+        return payloadObj
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid data")
+
+
+def encryptForClient(data: dict | bytes, client_pub: bytes, app: FastAPI) -> dict:
+    # orjson handles datetime/date natively; Records, asyncpg UUIDs and Decimal go through the hook.
+    # Callers holding already-serialized JSON (the lookup cache) pass the bytes.
+    plain = data if isinstance(data, bytes) else orjson.dumps(data, default=jsonDefault)
+    return seal(clientCipher(app, client_pub), plain)
 
-    def defaultEncoder(o):
-        if isinstance(o, Decimal):
-            return float(o)
-        raise TypeError(f"Object of type {o.__class__.__name__} is not JSON serializable")
 
-    cipher = aes.encrypt(iv, json.dumps(data, default=defaultEncoder).encode(), None)
+def seal(aes: AESGCM, plain: bytes) -> dict:
+    iv = os.urandom(12)
+    cipher = aes.encrypt(iv, plain, None)
     return {
         "nonce": base64.b64encode(iv).decode(),
         "ciphertext": base64.b64encode(cipher).decode(),
     }
 
 
-async def encryptForUser(data: dict, email: str, conn: Connection, app: FastAPI) -> dict:
-    row = await conn.fetchrow(
-        "SELECT public_key FROM user_key WHERE user_email=$1 AND purpose='sig'",
-        email,
-    )
+# Sealing and base64-encoding a big page (full listings, bundles) is moved to
+# the default thread pool; below this the hop costs more than the work.
+ENCRYPT_OFFLOAD_BYTES = 1 << 16
+
+
+async def encryptForUser(data: dict | bytes, email: str, conn: Connection, app: FastAPI) -> dict:
+    stmt = await conn.prepared(USER_KEY_SQL)
+    row = await stmt.fetchrow(email)
     if not row:
-        return data
-    return encryptForClient(data, row["public_key"], app)
+        return orjson.loads(data) if isinstance(data, bytes) else data
+    plain = data if isinstance(data, bytes) else orjson.dumps(data, default=jsonDefault)
+    aes = clientCipher(app, row["public_key"])
+    if len(plain) > ENCRYPT_OFFLOAD_BYTES:
+        return await asyncio.to_thread(seal, aes, plain)
+    return seal(aes, plain)
+
+
+# Every uvicorn worker runs the lifespan, so the relation rebuild is one
+# transaction behind a transaction-scoped advisory lock (safe through
+# PgBouncer): workers take turns and a policy load never sees the rows half
+# deleted.
+CASBIN_SYNC_LOCK = 0x63617362
 
 
 async def syncCasbinRelations(conn: Connection, enforcer: AsyncEnforcer, watcher=None):
-    await conn.execute(
-        "DELETE FROM casbin_rule WHERE ptype='g' AND v1 IN ('account_manager_client','client_admin_technician')"
-    )
-    await enforcer.load_policy()
-    enforcer.build_role_links()
+    async with conn.transaction():
+        await conn.execute("SELECT pg_advisory_xact_lock($1)", CASBIN_SYNC_LOCK)
+        await conn.execute(
+            "DELETE FROM casbin_rule WHERE ptype='g' AND v1 IN ('account_manager_client','client_admin_technician')"
+        )
+        amRows = await conn.fetch(
+            "SELECT account_manager_email, client_id FROM account_manager_client"
+        )
+        caRows = await conn.fetch(
+            "SELECT client_admin_email, technician_email FROM client_admin_technician"
+        )
+        mappings = (
+            [(r["account_manager_email"], "account_manager_client", str(r["client_id"])) for r in amRows]
+            + [(r["client_admin_email"], "client_admin_technician", r["technician_email"]) for r in caRows]
+        )
+        if mappings:
+            await conn.executemany(
+                "INSERT INTO casbin_rule (ptype, v0, v1, v2) VALUES ('g',$1,$2,$3) ON CONFLICT DO NOTHING",
+                mappings,
+            )
+    # the adapter reads on its own connection, so load only after the commit
+    await loadPolicy(enforcer)
     if watcher:
         watcher.update()
-    amRows = await conn.fetch(
-        "SELECT account_manager_email, client_id FROM account_manager_client"
-    )
-    for r in amRows:
-        await save_role_mapping(
-            conn,
-            r["account_manager_email"],
-            "account_manager_client",
-            str(r["client_id"]),
-        )
 
-    caRows = await conn.fetch(
-        "SELECT client_admin_email, technician_email FROM client_admin_technician"
+
+# Streams a one-column query into a Redis set in fixed-size SADDs, so neither
+# the Python list nor a single Redis command grows with the table.
+REDIS_WARM_BATCH = 1000
+
+
+async def warmRedisSet(conn: Connection, redis: Redis, key: str, sql: str):
+    batch = []
+    async with conn.transaction():
+        async for record in conn.cursor(sql, prefetch=REDIS_WARM_BATCH):
+            batch.append(str(record[0]))
+            if len(batch) >= REDIS_WARM_BATCH:
+                await redis.sadd(key, *batch)
+                batch.clear()
+    if batch:
+        await redis.sadd(key, *batch)
+
+
+PUBSUB_BATCH_MAX = 100
+PUBSUB_FLUSH_DELAY = 0.005
+
+
+async def fetchKmsKeys(client: httpx.AsyncClient) -> tuple[str, str, str, str]:
+    priv, pub, edPriv, edPub = await asyncio.gather(
+        client.get("/private-key"),
+        client.get("/public-key"),
+        client.get("/ed25519-private-key"),
+        client.get("/ed25519-public-key"),
+    )
+    return (
+        priv.json()["privateKey"],
+        pub.json()["publicKey"],
+        edPriv.json()["privateKey"],
+        edPub.json()["publicKey"],
     )
-    for r in caRows:
-        await save_role_mapping(
-            conn,
-            r["client_admin_email"],
-            "client_admin_technician",
-            r["technician_email"],
-        )
 
 
 @asynccontextmanager
@@ -276,8 +907,7 @@ async def lifespan(app: FastAPI):
     adapter = Adapter(engine, db_class=CasbinRule)
     enforcer = AsyncEnforcer("model.conf", adapter)
     enforcer.enable_auto_save(True)
-    await enforcer.load_policy()
-    enforcer.build_role_links()
+    await loadPolicy(enforcer)
 
     opts = WatcherOptions()
     opts.host = "localhost"
@@ -285,7 +915,7 @@ async def lifespan(app: FastAPI):
     watcher = new_watcher(opts)
     loop = asyncio.get_running_loop()
     watcher.set_update_callback(lambda _: asyncio.run_coroutine_threadsafe(
-        enforcer.load_policy(), loop
+        loadPolicy(enforcer), loop
     ))
     enforcer.set_watcher(watcher)
 
@@ -293,92 +923,118 @@ async def lifespan(app: FastAPI):
     app.state.enforcer = enforcer
 
     app.state.db_pool: Pool = await create_pool(
-        dsn=ASYNCPG_URL, min_size=5, max_size=20
+        dsn=POOLED_DB_URL,
+        # one pool per worker, sized per deployment (see constants)
+        min_size=DB_POOL_MIN_SIZE,
+        max_size=DB_POOL_MAX_SIZE,
+        max_queries=50000,
+        max_inactive_connection_lifetime=300,
+        # every endpoint's SQL is static text, so asyncpg's per-connection
+        # statement cache can hold all of them and skip re-parsing/planning
+        statement_cache_size=1024,
+        max_cacheable_statement_size=1 << 16,
+        connection_class=CrmConnection,
+        init=warmConnection,
+        server_settings={
+            "tcp_keepalives_idle": "30",
+            "tcp_keepalives_interval": "10",
+            "tcp_keepalives_count": "3",
+        },
     )
     print("DB pool created")
 
     redis = Redis.from_url(REDIS_URL, decode_responses=True)
     app.state.redis = redis
     async with app.state.db_pool.acquire() as c:
-        rows = await c.fetch("SELECT jti FROM jwt_token WHERE revoked=FALSE AND expires_at>NOW()")
-        if rows:
-            await redis.sadd("active_jtis", *[str(r["jti"]) for r in rows])
-        rows = await c.fetch("SELECT email FROM \"user\" WHERE is_blacklisted=TRUE")
-        if rows:
-            await redis.sadd("blacklisted_users", *[str(r["email"]) for r in rows])
+        await warmRedisSet(c, redis, "active_jtis", "SELECT jti FROM jwt_token WHERE revoked=FALSE AND expires_at>NOW()")
+        await warmRedisSet(c, redis, "blacklisted_users", "SELECT email FROM \"user\" WHERE is_blacklisted=TRUE")
         await syncCasbinRelations(c, enforcer)
+        await preloadLookups(c)
 
-    async def listen_jwt():
-        pub = redis.pubsub()
-        await pub.subscribe("jwt_updates")
-        async for m in pub.listen():
-            if m.get("type") != "message":
-                continue
-            d = m.get("data")
-            if isinstance(d, bytes):
-                d = d.decode()
-            if d.startswith("add:"):
-                await redis.sadd("active_jtis", d[4:])
-            elif d.startswith("remove:"):
-                await redis.srem("active_jtis", d[7:])
-
-    async def listen_blacklist():
+    # lookup tables NOTIFY on every write, so each worker drops its copy
+    # right away instead of serving it until the TTL runs out
+    lookupListener = await connect(ASYNCPG_URL)
+    await lookupListener.add_listener(
+        "lookup_invalidate", lambda _conn, _pid, _channel, table: invalidateLookups(table)
+    )
+    app.state.lookup_listener = lookupListener
+
+    # Mirror the add:/remove: messages into their redis set. A burst is queued
+    # on one pipeline (so order is kept) and sent once PUBSUB_BATCH_MAX
+    # updates pile up or the channel stays quiet for PUBSUB_FLUSH_DELAY.
+    async def relaySetUpdates(channel: str, key: str):
         pub = redis.pubsub()
-        await pub.subscribe("blacklist_updates")
-        async for m in pub.listen():
-            if m.get("type") != "message":
-                continue
-            d = m.get("data")
-            if isinstance(d, bytes):
-                d = d.decode()
-            if d.startswith("add:"):
-                await redis.sadd("blacklisted_users", d[4:])
-            elif d.startswith("remove:"):
-                await redis.srem("blacklisted_users", d[7:])
-
-    asyncio.create_task(listen_jwt())
-    asyncio.create_task(listen_blacklist())
-
-    async with httpx.AsyncClient() as client:
-        privRes = await client.get(f"{KMS_URL}/private-key")
-        pubRes = await client.get(f"{KMS_URL}/public-key")
-        edPrivRes = await client.get(f"{KMS_URL}/ed25519-private-key")
-        edPubRes = await client.get(f"{KMS_URL}/ed25519-public-key")
-    app.state.privateKey = privRes.json()["privateKey"]
-    app.state.publicKey = pubRes.json()["publicKey"]
-    app.state.ed25519PrivateKey = edPrivRes.json()["privateKey"]
-    app.state.ed25519PublicKey = edPubRes.json()["publicKey"]
+        await pub.subscribe(channel)
+        pipe = redis.pipeline(transaction=False)
+        pending = 0
+        while True:
+            m = await pub.get_message(
+                ignore_subscribe_messages=True,
+                timeout=PUBSUB_FLUSH_DELAY if pending else None,
+            )
+            if m is not None and m.get("type") == "message":
+                d = m.get("data")
+                if isinstance(d, bytes):
+                    d = d.decode()
+                if d.startswith("add:"):
+                    pipe.sadd(key, d[4:])
+                    pending += 1
+                elif d.startswith("remove:"):
+                    pipe.srem(key, d[7:])
+                    pending += 1
+                if pending < PUBSUB_BATCH_MAX:
+                    continue
+            if pending:
+                await pipe.execute()
+                pending = 0
+
+    asyncio.create_task(relaySetUpdates("jwt_updates", "active_jtis"))
+    asyncio.create_task(relaySetUpdates("blacklist_updates", "blacklisted_users"))
+
+    # one client for the app's lifetime; the four key fetches run concurrently
+    app.state.kms_client = httpx.AsyncClient(base_url=KMS_URL, timeout=5.0)
+    (
+        app.state.privateKey,
+        app.state.publicKey,
+        app.state.ed25519PrivateKey,
+        app.state.ed25519PublicKey,
+    ) = await fetchKmsKeys(app.state.kms_client)
+    app.state.server_curve_priv = serverCurvePrivateKey(app.state.ed25519PrivateKey, app.state.ed25519PublicKey)
 
     async def refreshKeys():
         while True:
             await asyncio.sleep(21600)
-            async with httpx.AsyncClient() as c:
-                priv = await c.get(f"{KMS_URL}/private-key")
-                pub = await c.get(f"{KMS_URL}/public-key")
-                edPriv = await c.get(f"{KMS_URL}/ed25519-private-key")
-                edPub = await c.get(f"{KMS_URL}/ed25519-public-key")
-            if (
-                    priv.json()["privateKey"] != app.state.privateKey or
-                    pub.json()["publicKey"] != app.state.publicKey or
-                    edPriv.json()["privateKey"] != app.state.ed25519PrivateKey or
-                    edPub.json()["publicKey"] != app.state.ed25519PublicKey
+            keys = await fetchKmsKeys(app.state.kms_client)
+            if keys != (
+                    app.state.privateKey,
+                    app.state.publicKey,
+                    app.state.ed25519PrivateKey,
+                    app.state.ed25519PublicKey,
             ):
-                app.state.privateKey = priv.json()["privateKey"]
-                app.state.publicKey = pub.json()["publicKey"]
-                app.state.ed25519PrivateKey = edPriv.json()["privateKey"]
-                app.state.ed25519PublicKey = edPub.json()["publicKey"]
+                (
+                    app.state.privateKey,
+                    app.state.publicKey,
+                    app.state.ed25519PrivateKey,
+                    app.state.ed25519PublicKey,
+                ) = keys
+                app.state.server_curve_priv = serverCurvePrivateKey(
+                    app.state.ed25519PrivateKey, app.state.ed25519PublicKey
+                )
+                clientCiphers.clear()
 
     asyncio.create_task(refreshKeys())
 
     try:
         yield
     finally:
+        await app.state.kms_client.aclose()
+        await app.state.lookup_listener.close()
         await app.state.db_pool.close()
         await app.state.redis.close()
         print("DB pool closed")
 
 
-app = FastAPI(lifespan=lifespan, dependencies=[Depends(authorize)])
+app = FastAPI(lifespan=lifespan, dependencies=[Depends(authorize)], default_response_class=ORJSONResponse)
 origins = [
     "http://localhost:3000",
 ]
@@ -389,6 +1045,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
     max_age=86400,
 )
 
@@ -409,9 +1066,68 @@ async def save_role_mapping(conn: Connection, sub: str, role: str, dom: str = "*
             dom,
         )
 
-    await app.state.enforcer.load_policy()
-    app.state.enforcer.build_role_links()
-    app.state.casbin_watcher.update()
+    schedulePolicyReload()
+
+
+# Relation edits replace one grouping rule with another; the delete and the
+# insert go out as a single statement. The delete spares the new rule so an
+# edit that changes nothing keeps it.
+async def move_role_mapping(conn: Connection, role: str, oldSub: str, oldDom: str, newSub: str, newDom: str):
+    await conn.execute(
+        """
+        WITH gone AS (
+          DELETE FROM casbin_rule
+           WHERE ptype='g' AND v0=$1 AND v1=$2 AND v2=$3
+             AND NOT (v0=$4 AND v2=$5)
+        )
+        INSERT INTO casbin_rule (ptype, v0, v1, v2) VALUES ('g',$4,$2,$5) ON CONFLICT DO NOTHING
+        """,
+        oldSub,
+        role,
+        oldDom,
+        newSub,
+        newDom,
+    )
+
+    schedulePolicyReload()
+
+
+# Admin screens write several mappings back to back (a delete then an insert
+# per update); one reload shortly after the burst replaces one per write.
+POLICY_RELOAD_DELAY = 0.1
+policyReloadTask: asyncio.Task | None = None
+
+
+def schedulePolicyReload():
+    global policyReloadTask
+    if policyReloadTask is None:
+        policyReloadTask = asyncio.create_task(reloadPolicy())
+
+
+async def reloadPolicy():
+    global policyReloadTask
+    await asyncio.sleep(POLICY_RELOAD_DELAY)
+    # writes from here on schedule the next reload rather than joining this one
+    policyReloadTask = None
+    try:
+        await loadPolicy(app.state.enforcer)
+        app.state.casbin_watcher.update()
+    except Exception as e:
+        print("POLICY RELOAD FAILED: ", e)
+
+
+# Bulk form of save_role_mapping: one executemany and a single policy reload
+# instead of a full reload per inserted row.
+async def save_role_mappings(conn: Connection, mappings: list[tuple[str, str, str]], enforcer: AsyncEnforcer,
+                             watcher=None):
+    if mappings:
+        await conn.executemany(
+            "INSERT INTO casbin_rule (ptype, v0, v1, v2) VALUES ('g',$1,$2,$3) ON CONFLICT DO NOTHING",
+            mappings,
+        )
+    await loadPolicy(enforcer)
+    if watcher:
+        watcher.update()
 
 
 @app.post("/auth/public-key")
@@ -432,7 +1148,7 @@ async def whoami(user: SimpleUser = Depends(getCurrentUser), enforcer: AsyncEnfo
             detail="unauthenticated",
         )
 
-    roles = await enforcer.get_roles_for_user_in_domain(user.email, "*")
+    roles = await userRoles(enforcer, user.email)
     print("ROLES: ", roles)
     return {
         "email": user.email,
@@ -445,8 +1161,12 @@ async def whoami(user: SimpleUser = Depends(getCurrentUser), enforcer: AsyncEnfo
     }
 
 
+MAGIC_LINK_SQL = "SELECT consumed, expires_at FROM magic_link WHERE uuid=$1"
+WARM_STATEMENTS.append(MAGIC_LINK_SQL)
+
+
 @app.post("/auth/validate-signup-token")
-async def validateSignupToken(request: Request, data: dict = Depends(decryptPayload()),
+async def validateSignupToken(request: Request, data: dict = Depends(decryptPayload),
                               conn: Connection = Depends(get_conn)):
     token = data.get("token")
 
@@ -456,17 +1176,15 @@ async def validateSignupToken(request: Request, data: dict = Depends(decryptPayl
         raise HTTPException(status_code=400, detail="invalid token")
 
     uuid_str = payload.get("uuid")
-    if not uuid_str or not await isUUIDv4(uuid_str):
+    if not uuid_str or not isUUIDv4(uuid_str):
         raise HTTPException(status_code=400, detail="invalid token uuid")
 
-    row = await conn.fetchrow(
-        "SELECT consumed, expires_at FROM magic_link WHERE uuid=$1",
-        UUID(uuid_str),
-    )
+    stmt = await conn.prepared(MAGIC_LINK_SQL)
+    row = await stmt.fetchrow(UUID(uuid_str))
     if (
             not row
             or row["consumed"]
-            or row["expires_at"] < datetime.now(timezone.utc)
+            or row["expires_at"].timestamp() < time.time()
     ):
         raise HTTPException(status_code=400, detail="invalid sql data")
 
@@ -481,7 +1199,7 @@ async def validateSignupToken(request: Request, data: dict = Depends(decryptPayl
 @app.post("/auth/validate-login-token")
 async def validateLoginToken(
         request: Request,
-        data: dict = Depends(decryptPayload()),
+        data: dict = Depends(decryptPayload),
         conn: Connection = Depends(get_conn),
 ):
     token_str = data.get("token")
@@ -491,33 +1209,40 @@ async def validateLoginToken(
         raise HTTPException(status_code=400, detail="invalid token")
 
     link_uuid = payload.get("uuid")
-    if not link_uuid or not await isUUIDv4(link_uuid):
-        raise HTTPException(status_code=400, detail="invalid token")
-
-    row = await conn.fetchrow(
-        "SELECT consumed, expires_at, user_email FROM magic_link WHERE uuid=$1",
-        UUID(link_uuid),
-    )
-    if not row or row["consumed"] or row["expires_at"] < datetime.now(timezone.utc):
+    if not link_uuid or not isUUIDv4(link_uuid):
         raise HTTPException(status_code=400, detail="invalid token")
 
-    userEmail = row["user_email"]
     jti = str(uuid4())
     exp_dt = datetime.now(timezone.utc) + timedelta(minutes=60 * 24)
-    await conn.execute(
-        "INSERT INTO jwt_token (jti, user_email, expires_at, revoked) VALUES ($1,$2,$3,FALSE)",
+    # consuming the link and issuing the session is one statement, so a
+    # double submit can't mint two sessions from the same link
+    userEmail = await conn.fetchval(
+        """
+        WITH link AS (
+          UPDATE magic_link SET consumed=TRUE
+           WHERE uuid=$1 AND consumed=FALSE AND expires_at > now()
+          RETURNING user_email
+        )
+        INSERT INTO jwt_token (jti, user_email, expires_at, revoked)
+        SELECT $2, user_email, $3, FALSE FROM link
+        RETURNING user_email
+        """,
+        UUID(link_uuid),
         jti,
-        userEmail,
         exp_dt,
     )
+    if not userEmail:
+        raise HTTPException(status_code=400, detail="invalid token")
+
     redis = request.app.state.redis
-    await redis.sadd("active_jtis", jti)
-    await redis.publish("jwt_updates", f"add:{jti}")
-    await conn.execute("UPDATE magic_link SET consumed=TRUE WHERE uuid=$1", UUID(link_uuid))
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.sadd("active_jtis", jti)
+        pipe.publish("jwt_updates", f"add:{jti}")
+        await pipe.execute()
 
     next_payload = {
         "next_step": "/dashboard",
-        "exp": int((datetime.now(timezone.utc) + timedelta(minutes=(60 * 24))).timestamp()),
+        "exp": int(exp_dt.timestamp()),
     }
     nav_token = generateJwtRs256(next_payload, request.app.state.privateKey)
     session_token = jwt.encode({"sub": userEmail, "jti": jti, "exp": exp_dt}, SECRET_KEY, algorithm="HS256")
@@ -550,10 +1275,50 @@ async def uploadDocument(fileBlob: bytes) -> dict:
 # TODO:                           HEADER ENDPOINTS                             #
 ################################################################################
 
+# is_deleted = FALSE is pushed into every branch of the view so the
+# partial idx_*_search_text GIN indexes are usable
+GLOBAL_SEARCH_SQL = """
+    SELECT source_table, record_id, search_text, is_deleted
+      FROM global_search
+     WHERE is_deleted = FALSE
+       AND search_text ILIKE '%' || $1 || '%'
+     ORDER BY source_table, record_id
+     LIMIT 10;
+"""
+
+# every admin, plus the account managers assigned to the caller's client;
+# two plain joins instead of a per-row EXISTS, and the caller's client
+# is resolved in the same statement. Both queries alias their columns to the
+# payload's keys so the Records are sent as-is.
+CLIENT_MENTION_USERS_SQL = """
+    SELECT u.email, u.first_name AS "firstName", u.last_name AS "lastName", r.v1 AS role
+    FROM "user" u
+    JOIN casbin_rule r ON r.ptype='g' AND r.v1='employee_admin' AND r.v0=u.email
+    UNION ALL
+    SELECT u.email, u.first_name, u.last_name, r.v1
+    FROM "user" u
+    JOIN casbin_rule r ON r.ptype='g' AND r.v1='employee_account_manager' AND r.v0=u.email
+    JOIN account_manager_client amc
+      ON amc.account_manager_email=u.email
+     AND amc.client_id=(SELECT client_id FROM "user" WHERE email=$1)
+    ORDER BY "firstName"
+"""
+
+EMPLOYEE_MENTION_USERS_SQL = """
+    SELECT u.email, u.first_name AS "firstName", u.last_name AS "lastName", r.v1 AS role
+    FROM "user" u
+    JOIN casbin_rule r ON r.ptype='g' AND r.v0=u.email
+    WHERE r.v1 IN ('employee_admin','employee_account_manager')
+      AND u.is_active=TRUE
+    ORDER BY u.first_name
+"""
+
+WARM_STATEMENTS.extend([GLOBAL_SEARCH_SQL, CLIENT_MENTION_USERS_SQL, EMPLOYEE_MENTION_USERS_SQL])
+
 @app.post("/global-search")
 async def globalSearch(
         request: Request,
-        data: dict = Depends(decryptPayload()),
+        data: dict = Depends(decryptPayload),
         q: str | None = Query(None, description="Search query string"),
         conn: Connection = Depends(get_conn),
         user: SimpleUser = Depends(getCurrentUser)
@@ -561,20 +1326,16 @@ async def globalSearch(
     term = data.get("q") or q
     if not term:
         raise HTTPException(status_code=400, detail="Missing search term")
-    globalSearchSql = """
-        SELECT source_table, record_id, search_text, is_deleted
-          FROM global_search
-         WHERE  length($1::text) >= 3
-           AND search_text ILIKE '%' || $1 || '%'
-         ORDER BY source_table, record_id
-         LIMIT 10;
-    """
-
-    try:
-        results = await conn.fetch(globalSearchSql, term)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    payload = {"results": [dict(r) for r in results]}
+    # trigram indexes can't serve patterns shorter than three characters
+    if len(term) < 3:
+        results = []
+    else:
+        try:
+            stmt = await conn.prepared(GLOBAL_SEARCH_SQL)
+            results = await stmt.fetch(term)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+    payload = {"results": results}
     if user:
         payload = await encryptForUser(payload, user.email, conn, request.app)
     return payload
@@ -583,63 +1344,28 @@ async def globalSearch(
 @app.post("/get-mention-users")
 async def getMentionUsers(
         request: Request,
-        data: dict = Depends(decryptPayload()),
+        data: dict = Depends(decryptPayload),
         conn: Connection = Depends(get_conn),
         user: SimpleUser = Depends(getCurrentUser),
         enforcer: AsyncEnforcer = Depends(getEnforcer)):
     if not user:
         raise HTTPException(status_code=401, detail="unauthenticated")
-    roles = await enforcer.get_roles_for_user_in_domain(user.email, "*")
+    roles = await userRoles(enforcer, user.email)
     rows = []
     if "client_admin" in roles or "client_technician" in roles:
-        client_id = await conn.fetchval(
-            'SELECT client_id FROM "user" WHERE email=$1', user.email)
-        rows = await conn.fetch(
-            """
-            SELECT u.email, u.first_name, u.last_name, r.v1 AS role
-            FROM "user" u
-            JOIN casbin_rule r ON r.ptype='g' AND r.v0=u.email
-            WHERE r.v1 IN ('employee_admin','employee_account_manager')
-              AND (
-                r.v1='employee_admin' OR EXISTS (
-                  SELECT 1 FROM account_manager_client amc
-                  WHERE amc.client_id=$1 AND amc.account_manager_email=u.email
-                )
-              )
-            ORDER BY u.first_name
-            """,
-            client_id,
-        )
+        stmt = await conn.prepared(CLIENT_MENTION_USERS_SQL)
+        rows = await stmt.fetch(user.email)
     elif "employee_admin" in roles or "employee_account_manager" in roles:
-        rows = await conn.fetch(
-            """
-            SELECT u.email, u.first_name, u.last_name, r.v1 AS role
-            FROM "user" u
-            JOIN casbin_rule r ON r.ptype='g' AND r.v0=u.email
-            WHERE r.v1 IN ('employee_admin','employee_account_manager')
-              AND u.is_active=TRUE
-            ORDER BY u.first_name
-            """
-        )
-    payload = {
-        "users": [
-            {
-                "email": r["email"],
-                "firstName": r["first_name"],
-                "lastName": r["last_name"],
-                "role": r["role"],
-            }
-            for r in rows
-        ]
-    }
-    payload = await encryptForUser(payload, user.email, conn, request.app)
+        stmt = await conn.prepared(EMPLOYEE_MENTION_USERS_SQL)
+        rows = await stmt.fetch()
+    payload = await encryptForUser({"users": rows}, user.email, conn, request.app)
     return payload
 
 
 @app.post("/get-account-manager-client-relations")
 async def getAccountManagerClientRelations(
         request: Request,
-        data: dict = Depends(decryptPayload()),
+        data: dict = Depends(decryptPayload),
         conn: Connection = Depends(get_conn),
         user: SimpleUser = Depends(getCurrentUser)):
     sql = """
@@ -654,7 +1380,7 @@ async def getAccountManagerClientRelations(
         rows = await conn.fetch(sql)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    payload = {"relations": [dict(r) for r in rows]}
+    payload = {"relations": rows}
     if user:
         payload = await encryptForUser(payload, user.email, conn, request.app)
     return payload
@@ -662,7 +1388,7 @@ async def getAccountManagerClientRelations(
 
 @app.post("/create-account-manager-client-relation")
 async def createAccountManagerClientRelation(
-        data: dict = Depends(decryptPayload()),
+        data: dict = Depends(decryptPayload),
         conn: Connection = Depends(get_conn)
 ):
     email = data.get("account_manager_email")
@@ -684,7 +1410,7 @@ async def createAccountManagerClientRelation(
 
 @app.post("/delete-account-manager-client-relation")
 async def deleteAccountManagerClientRelation(
-        data: dict = Depends(decryptPayload()),
+        data: dict = Depends(decryptPayload),
         conn: Connection = Depends(get_conn)
 ):
     email = data.get("account_manager_email")
@@ -704,109 +1430,9 @@ async def deleteAccountManagerClientRelation(
     return {"status": "deleted"}
 
 
-@app.post("/update-project-priority")
-async def updateProjectPriority(data: dict = Depends(decryptPayload()), conn: Connection = Depends(get_conn)):
-    return await adminUpdateRecord({**data, "table": "project_priority"}, conn)
-
-
-@app.post("/delete-project-priority")
-async def deleteProjectPriority(data: dict = Depends(decryptPayload()), conn: Connection = Depends(get_conn)):
-    return await adminDeleteRecord({"table": "project_priority", "id": data.get("id")}, conn)
-
-
-@app.post("/update-project-type")
-async def updateProjectType(data: dict = Depends(decryptPayload()), conn: Connection = Depends(get_conn)):
-    return await adminUpdateRecord({**data, "table": "project_type"}, conn)
-
-
-@app.post("/delete-project-type")
-async def deleteProjectType(data: dict = Depends(decryptPayload()), conn: Connection = Depends(get_conn)):
-    return await adminDeleteRecord({"table": "project_type", "id": data.get("id")}, conn)
-
-
-@app.post("/update-project-trade")
-async def updateProjectTrade(data: dict = Depends(decryptPayload()), conn: Connection = Depends(get_conn)):
-    return await adminUpdateRecord({**data, "table": "project_trade"}, conn)
-
-
-@app.post("/delete-project-trade")
-async def deleteProjectTrade(data: dict = Depends(decryptPayload()), conn: Connection = Depends(get_conn)):
-    return await adminDeleteRecord({"table": "project_trade", "id": data.get("id")}, conn)
-
-
-@app.post("/update-state")
-async def updateState(data: dict = Depends(decryptPayload()), conn: Connection = Depends(get_conn)):
-    return await adminUpdateRecord({**data, "table": "state"}, conn)
-
-
-@app.post("/delete-state")
-async def deleteState(data: dict = Depends(decryptPayload()), conn: Connection = Depends(get_conn)):
-    return await adminDeleteRecord({"table": "state", "id": data.get("id")}, conn)
-
-
-@app.post("/update-client-type")
-async def updateClientType(data: dict = Depends(decryptPayload()), conn: Connection = Depends(get_conn)):
-    return await adminUpdateRecord({**data, "table": "client_type"}, conn)
-
-
-@app.post("/delete-client-type")
-async def deleteClientType(data: dict = Depends(decryptPayload()), conn: Connection = Depends(get_conn)):
-    return await adminDeleteRecord({"table": "client_type", "id": data.get("id")}, conn)
-
-
-@app.post("/update-pay-term")
-async def updatePayTerm(data: dict = Depends(decryptPayload()), conn: Connection = Depends(get_conn)):
-    return await adminUpdateRecord({**data, "table": "pay_term"}, conn)
-
-
-@app.post("/delete-pay-term")
-async def deletePayTerm(data: dict = Depends(decryptPayload()), conn: Connection = Depends(get_conn)):
-    return await adminDeleteRecord({"table": "pay_term", "id": data.get("id")}, conn)
-
-
-@app.post("/update-project-status")
-async def updateProjectStatus(data: dict = Depends(decryptPayload()), conn: Connection = Depends(get_conn)):
-    return await adminUpdateRecord({**data, "table": "status", "category": "project"}, conn)
-
-
-@app.post("/delete-project-status")
-async def deleteProjectStatus(data: dict = Depends(decryptPayload()), conn: Connection = Depends(get_conn)):
-    return await adminDeleteRecord({"table": "status", "id": data.get("id")}, conn)
-
-
-@app.post("/update-quote-status")
-async def updateQuoteStatus(data: dict = Depends(decryptPayload()), conn: Connection = Depends(get_conn)):
-    return await adminUpdateRecord({**data, "table": "status", "category": "quote"}, conn)
-
-
-@app.post("/delete-quote-status")
-async def deleteQuoteStatus(data: dict = Depends(decryptPayload()), conn: Connection = Depends(get_conn)):
-    return await adminDeleteRecord({"table": "status", "id": data.get("id")}, conn)
-
-
-@app.post("/update-invoice-status")
-async def updateInvoiceStatus(data: dict = Depends(decryptPayload()), conn: Connection = Depends(get_conn)):
-    return await adminUpdateRecord({**data, "table": "status", "category": "invoice"}, conn)
-
-
-@app.post("/delete-invoice-status")
-async def deleteInvoiceStatus(data: dict = Depends(decryptPayload()), conn: Connection = Depends(get_conn)):
-    return await adminDeleteRecord({"table": "status", "id": data.get("id")}, conn)
-
-
-@app.post("/update-client-status")
-async def updateClientStatus(data: dict = Depends(decryptPayload()), conn: Connection = Depends(get_conn)):
-    return await adminUpdateRecord({**data, "table": "status", "category": "client"}, conn)
-
-
-@app.post("/delete-client-status")
-async def deleteClientStatus(data: dict = Depends(decryptPayload()), conn: Connection = Depends(get_conn)):
-    return await adminDeleteRecord({"table": "status", "id": data.get("id")}, conn)
-
-
 @app.post("/update-account-manager-client-relation")
 async def updateAccountManagerClientRelation(
-        data: dict = Depends(decryptPayload()),
+        data: dict = Depends(decryptPayload),
         conn: Connection = Depends(get_conn)
 ):
     old_email = data.get("old_account_manager_email")
@@ -824,8 +1450,8 @@ async def updateAccountManagerClientRelation(
 
     try:
         await conn.execute(sql, new_email, UUID(new_client), old_email, UUID(old_client))
-        await save_role_mapping(conn, old_email, "account_manager_client", str(UUID(old_client)), delete=True)
-        await save_role_mapping(conn, new_email, "account_manager_client", str(UUID(new_client)))
+        await move_role_mapping(conn, "account_manager_client", old_email, str(UUID(old_client)),
+                                new_email, str(UUID(new_client)))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -835,7 +1461,7 @@ async def updateAccountManagerClientRelation(
 @app.post("/get-client-admin-technician-relations")
 async def getClientAdminTechnicianRelations(
         request: Request,
-        data: dict = Depends(decryptPayload()),
+        data: dict = Depends(decryptPayload),
         conn: Connection = Depends(get_conn),
         user: SimpleUser = Depends(getCurrentUser)):
     sql = """
@@ -848,7 +1474,7 @@ async def getClientAdminTechnicianRelations(
         rows = await conn.fetch(sql)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    payload = {"relations": [dict(r) for r in rows]}
+    payload = {"relations": rows}
     if user:
         payload = await encryptForUser(payload, user.email, conn, request.app)
     return payload
@@ -856,7 +1482,7 @@ async def getClientAdminTechnicianRelations(
 
 @app.post("/create-client-admin-technician-relation")
 async def createClientAdminTechnicianRelation(
-        data: dict = Depends(decryptPayload()),
+        data: dict = Depends(decryptPayload),
         conn: Connection = Depends(get_conn)
 ):
     admin_email = data.get("client_admin_email")
@@ -881,7 +1507,7 @@ async def createClientAdminTechnicianRelation(
 
 @app.post("/update-client-admin-technician-relation")
 async def updateClientAdminTechnicianRelation(
-        data: dict = Depends(decryptPayload()),
+        data: dict = Depends(decryptPayload),
         conn: Connection = Depends(get_conn)
 ):
     old_admin = data.get("old_client_admin_email")
@@ -899,8 +1525,7 @@ async def updateClientAdminTechnicianRelation(
 
     try:
         await conn.execute(sql, admin_email, tech_email, old_admin, old_tech)
-        await save_role_mapping(conn, old_admin, "client_admin_technician", old_tech, delete=True)
-        await save_role_mapping(conn, admin_email, "client_admin_technician", tech_email)
+        await move_role_mapping(conn, "client_admin_technician", old_admin, old_tech, admin_email, tech_email)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -909,7 +1534,7 @@ async def updateClientAdminTechnicianRelation(
 
 @app.post("/delete-client-admin-technician-relation")
 async def deleteClientAdminTechnicianRelation(
-        data: dict = Depends(decryptPayload()),
+        data: dict = Depends(decryptPayload),
         conn: Connection = Depends(get_conn)
 ):
     admin_email = data.get("client_admin_email")
@@ -935,7 +1560,7 @@ async def deleteClientAdminTechnicianRelation(
 @app.post("/send-message")
 async def sendMessage(
         request: Request,
-        data: dict = Depends(decryptPayload()),
+        data: dict = Depends(decryptPayload),
         conn: Connection = Depends(get_conn),
         user: SimpleUser = Depends(getCurrentUser)
 ):
@@ -944,21 +1569,25 @@ async def sendMessage(
     mention_emails = data.get("mentions", [])
     if not project_id or not content:
         raise HTTPException(status_code=400, detail="invalid params")
-    roles = await request.app.state.enforcer.get_roles_for_user_in_domain(user.email, "*")
+    roles = await userRoles(request.app.state.enforcer, user.email)
     role = roles[0] if roles else ""
     try:
-        msg_id = await conn.fetchval(
-            "INSERT INTO message (project_id, sender_id, content, sender_role, has_mentions) VALUES ($1,$2,$3,$4,$5) RETURNING id",
-            UUID(project_id), user.id, content, role, bool(mention_emails)
-        )
-        created_at = await conn.fetchval(
-            "SELECT created_at FROM message WHERE id=$1", msg_id
-        )
-        for e in mention_emails:
-            await conn.execute(
-                "INSERT INTO message_mention (message_id, user_email) VALUES ($1,$2) ON CONFLICT DO NOTHING",
-                msg_id, e
+        # message and its mentions go in as one statement (and so atomically)
+        msg_id, created_at = await conn.fetchrow(
+            """
+            WITH msg AS (
+              INSERT INTO message (project_id, sender_id, content, sender_role, has_mentions)
+              VALUES ($1,$2,$3,$4,$5)
+              RETURNING id, created_at
+            ), mentions AS (
+              INSERT INTO message_mention (message_id, user_email)
+              SELECT msg.id, unnest($6::citext[]) FROM msg
+              ON CONFLICT DO NOTHING
             )
+            SELECT id, created_at FROM msg
+            """,
+            UUID(project_id), user.id, content, role, bool(mention_emails), mention_emails
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     payload = {"messageId": str(msg_id), "created_at": created_at.isoformat()}
@@ -970,7 +1599,7 @@ async def sendMessage(
 @app.post("/get-notifications")
 async def getNotifications(
         request: Request,
-        data: dict = Depends(decryptPayload()),
+        data: dict = Depends(decryptPayload),
         conn: Connection = Depends(get_conn),
         user: SimpleUser = Depends(getCurrentUser)
 ):
@@ -978,50 +1607,16 @@ async def getNotifications(
     last_seen_id = data.get("last_seen_id")
     size = data.get("size", 10)
 
-    if last_seen_created_at:
-        try:
-            dt = datetime.fromisoformat(last_seen_created_at)
-            cursor_ts = dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
-        except ValueError:
-            raise HTTPException(400, detail=f"Invalid timestamp: '{last_seen_created_at}'")
-    else:
-        cursor_ts = datetime.now(timezone.utc)
-
-    max_uuid = UUID("ffffffff-ffff-ffff-ffff-ffffffffffff")
-    cursor_id = last_seen_id or max_uuid
-
-    sql = """
-    SELECT
-      n.*,
-      COUNT(*) OVER() AS total_count
-    FROM notification n
-    WHERE (n.created_at, n.id) < ($1::timestamptz, $2::uuid)
-    ORDER BY n.created_at DESC, n.id DESC
-    LIMIT $3;
-    """
+    cursor_ts, cursor_id = parseCursor(last_seen_created_at, last_seen_id, data.get("cursor"))
 
     try:
-        rows = await conn.fetch(sql, cursor_ts, cursor_id, size)
+        page = await paginate(conn, "notifications", size, cursor_ts, cursor_id,
+                              includeTotal=wantsTotal(data, last_seen_created_at),
+                              columnar=bool(data.get("columnar")))
     except Exception as e:
-        raise HTTPException(500, detail=str(e))
-
-    total = rows[0]["total_count"] if rows else 0
-
-    if rows:
-        last = rows[-1]
-        next_ts = last["created_at"].isoformat()
-        next_id = str(last["id"])
-    else:
-        next_ts = None
-        next_id = None
+        raise HTTPException(status_code=500, detail=str(e))
 
-    payload = {
-        "notifications": [dict(r) for r in rows],
-        "total_count": total,
-        "page_size": size,
-        "last_seen_created_at": next_ts,
-        "last_seen_id": next_id,
-    }
+    payload = {"notifications": page.pop("rows"), **page}
     if user:
         payload = await encryptForUser(payload, user.email, conn, request.app)
     return payload
@@ -1030,7 +1625,7 @@ async def getNotifications(
 @app.post("/get-profile-details")
 async def getProfileDetails(
         request: Request,
-        data: dict = Depends(decryptPayload()),
+        data: dict = Depends(decryptPayload),
         user: SimpleUser = Depends(getCurrentUser),
         conn: Connection = Depends(get_conn)
 ):
@@ -1062,12 +1657,12 @@ async def getProfileDetails(
 @app.post("/project-assessments")
 async def getProjectAssessments(
         request: Request,
-        data: dict = Depends(decryptPayload()),
+        data: dict = Depends(decryptPayload),
         conn: Connection = Depends(get_conn),
         user: SimpleUser = Depends(getCurrentUser)
 ):
     projectId = data['projectId']
-    if not await isUUIDv4(projectId):
+    if not isUUIDv4(projectId):
         raise HTTPException(status_code=400, detail="Invalid project id")
 
     sql = """
@@ -1085,7 +1680,7 @@ async def getProjectAssessments(
     if not rec:
         raise HTTPException(status_code=404, detail="Not found")
 
-    payload = dict(rec)
+    payload = rec
 
     if user:
         payload = await encryptForUser(payload, user.email, conn, request.app)
@@ -1100,60 +1695,71 @@ async def getProjectAssessments(
 @app.post("/get-dashboard-metrics")
 async def getDashboardMetrics(
         request: Request,
-        data: dict = Depends(decryptPayload()),
+        response: Response,
+        data: dict = Depends(decryptPayload),
         conn: Connection = Depends(get_conn),
         user: SimpleUser = Depends(getCurrentUser)):
-    sql = "SELECT * FROM overall_aggregates;"
-
     try:
-        rows = await conn.fetch(sql)
+        rows, _, etag, body = await loadLookup(conn, "overall_aggregates")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    payload = {"metrics": [dict(r) for r in rows]}
-    if user:
-        payload = await encryptForUser(payload, user.email, conn, request.app)
-    return payload
+    cached = notModified(request, response, etag)
+    if cached:
+        return cached
+    return await lookupPayload("metrics", rows, body, user, conn, request.app)
+
+
+# Upper bound on one month's events so a busy month can't balloon the
+# response that has to be built and encrypted in memory
+CALENDAR_MAX_EVENTS = 500
 
 
 @app.post("/get-calendar-events")
 async def getCalendarEvents(
         request: Request,
-        data: dict = Depends(decryptPayload()),
+        data: dict = Depends(decryptPayload),
         conn: Connection = Depends(get_conn),
         user: SimpleUser = Depends(getCurrentUser)
 ):
     month = data["month"]
+    year = data.get("year") or datetime.now(timezone.utc).year
 
     if month < 1 or month > 12:
-        raise Exception()
+        raise HTTPException(status_code=400, detail="Invalid month")
 
+    # Month boundaries as a half-open date range so both branches stay sargable
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+
+    # One branch per covering partial index (idx_project_calendar_scheduled and
+    # idx_project_calendar_due) so each is an index-only range scan
     sql = """
-        SELECT
-          p.*,
-          COALESCE(p.scheduled_date, p.due_date) AS event_date
+        SELECT p.id, p.business_name, p.client_id, p.status_id, p.priority_id,
+               p.scheduled_date, p.due_date, p.scheduled_date AS event_date
+        FROM project p
+        WHERE p.is_deleted = FALSE
+          AND p.scheduled_date >= $1 AND p.scheduled_date < $2
+        UNION ALL
+        SELECT p.id, p.business_name, p.client_id, p.status_id, p.priority_id,
+               NULL::date AS scheduled_date, p.due_date, p.due_date AS event_date
         FROM project p
-        WHERE  (
-            (p.scheduled_date IS NOT NULL AND EXTRACT(MONTH FROM p.scheduled_date) = $1)
-            OR
-            (p.scheduled_date IS NULL     AND EXTRACT(MONTH FROM p.due_date)       = $1)
-          )
-        ORDER BY event_date, p.id;
+        WHERE p.is_deleted = FALSE
+          AND p.scheduled_date IS NULL
+          AND p.due_date >= $1 AND p.due_date < $2
+        ORDER BY event_date, id
+        LIMIT $3;
     """
 
     try:
-        records = await conn.fetch(sql, month)
+        stmt = await conn.prepared(sql)
+        records = await stmt.fetch(start, end, CALENDAR_MAX_EVENTS + 1)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-    # If you want to serialize `event_date` as ISO strings, convert each row to dict
-    events = []
-    for r in records:
-        d = dict(r)
-        # asyncpg returns dates as datetime.date, so cast to ISO string:
-        d["event_date"] = d["event_date"].isoformat()
-        events.append(d)
-
-    payload = {"events": events}
+    payload = {
+        "events": records[:CALENDAR_MAX_EVENTS],
+        "truncated": len(records) > CALENDAR_MAX_EVENTS,
+    }
     if user:
         payload = await encryptForUser(payload, user.email, conn, request.app)
     return payload
@@ -1167,7 +1773,7 @@ async def getCalendarEvents(
 @app.post("/get-projects")
 async def getProjects(
         request: Request,
-        data: dict = Depends(decryptPayload()),
+        data: dict = Depends(decryptPayload),
         conn: Connection = Depends(get_conn),
         user: SimpleUser = Depends(getCurrentUser)
 ):
@@ -1176,193 +1782,112 @@ async def getProjects(
     last_seen_id = data.get("last_seen_id")
     if not size:
         raise HTTPException(status_code=400, detail="size required")
-    # 1) parse the timestamp (or default to now)
-    if last_seen_created_at:
-        try:
-            dt = datetime.fromisoformat(last_seen_created_at)
-            cursor_ts = dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
-        except ValueError:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid timestamp: '{last_seen_created_at}'"
-            )
-    else:
-        cursor_ts = datetime.now(timezone.utc)
-
-    # 2) default the ID cursor to the MAX‐UUID when not provided
-    max_uuid = UUID("ffffffff-ffff-ffff-ffff-ffffffffffff")
-    cursor_id = last_seen_id or max_uuid
-
-    # 3) tuple‐comparison + tie‐break by id
-    sql = """
-    SELECT
-      p.*,
-      c.company_name,
-      s.value AS status_value,
-      COUNT(*) OVER() AS total_count
-    FROM project p
-    JOIN client  c ON c.id = p.client_id
-    JOIN status  s ON s.id = p.status_id AND s.category = 'project'
-      (p.created_at, p.id) < ($1::timestamptz, $2::uuid)
-      
-    ORDER BY p.created_at DESC, p.id DESC
-    LIMIT $3;
-    """
+    cursor_ts, cursor_id = parseCursor(last_seen_created_at, last_seen_id, data.get("cursor"))
 
     try:
-        rows = await conn.fetch(sql, cursor_ts, cursor_id, size)
+        page = await paginate(conn, "projects", size, cursor_ts, cursor_id,
+                              includeTotal=wantsTotal(data, last_seen_created_at),
+                              columnar=bool(data.get("columnar")))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-    total = rows[0]["total_count"] if rows else 0
-
-    # Build the next‐page cursors from the last row
-    if rows:
-        last = rows[-1]
-        next_ts = last["created_at"].isoformat()
-        next_id = str(last["id"])
-    else:
-        next_ts = None
-        next_id = None
-
-    payload = {
-        "projects": [dict(r) for r in rows],
-        "total_count": total,
-        "page_size": size,
-        "last_seen_created_at": next_ts,
-        "last_seen_id": next_id,
-    }
+    payload = {"projects": page.pop("rows"), **page}
     if user:
         payload = await encryptForUser(payload, user.email, conn, request.app)
     return payload
 
 
+@app.post("/bootstrap")
+async def bootstrap(
+        request: Request,
+        data: dict = Depends(decryptPayload),
+        conn: Connection = Depends(get_conn),
+        user: SimpleUser = Depends(getCurrentUser)):
+    """Project statuses, types and trades in a single round-trip, served from the lookup cache."""
+    try:
+        statuses, _, _, statusBody = await loadLookup(conn, "status:project")
+        types, _, _, typeBody = await loadLookup(conn, "project_type")
+        trades, _, _, tradeBody = await loadLookup(conn, "project_trade")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if not user:
+        return {"project_statuses": statuses, "project_types": types, "project_trades": trades}
+    body = b'{"project_statuses":%s,"project_types":%s,"project_trades":%s}' % (statusBody, typeBody, tradeBody)
+    return await encryptForUser(body, user.email, conn, request.app)
+
+
 @app.post("/get-project-statuses")
 async def getProjectStatuses(
         request: Request,
-        data: dict = Depends(decryptPayload()),
+        response: Response,
+        data: dict = Depends(decryptPayload),
         conn: Connection = Depends(get_conn),
         user: SimpleUser = Depends(getCurrentUser)):
-    sql = """
-            SELECT id, value, color
-            FROM status
-            WHERE category = 'project'
-              
-            ORDER BY value;
-        """
-
     try:
-        rows = await conn.fetch(sql)
+        rows, _, etag, body = await loadLookup(conn, "status:project")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    payload = {"project_statuses": [
-        {
-            "id": str(r["id"]),
-            "value": r["value"],
-            "color": r["color"]
-        }
-        for r in rows
-    ]}
-    if user:
-        payload = await encryptForUser(payload, user.email, conn, request.app)
-    return payload
+    cached = notModified(request, response, etag)
+    if cached:
+        return cached
+    return await lookupPayload("project_statuses", rows, body, user, conn, request.app)
 
 
 @app.post("/get-project-types")
 async def getProjectTypes(
         request: Request,
-        data: dict = Depends(decryptPayload()),
+        response: Response,
+        data: dict = Depends(decryptPayload),
         conn: Connection = Depends(get_conn),
         user: SimpleUser = Depends(getCurrentUser)):
-    sql = """
-            SELECT id, value
-            FROM project_type
-            ORDER BY value;
-        """
-
     try:
-        rows = await conn.fetch(sql)
+        rows, _, etag, body = await loadLookup(conn, "project_type")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    payload = {
-        "project_types": [
-            {
-                "id": str(r["id"]),
-                "value": r["value"]
-            }
-            for r in rows
-        ]
-    }
-    if user:
-        payload = await encryptForUser(payload, user.email, conn, request.app)
-    return payload
+    cached = notModified(request, response, etag)
+    if cached:
+        return cached
+    return await lookupPayload("project_types", rows, body, user, conn, request.app)
 
 
 @app.post("/get-project-trades")
 async def getProjectTrades(
         request: Request,
-        data: dict = Depends(decryptPayload()),
+        response: Response,
+        data: dict = Depends(decryptPayload),
         conn: Connection = Depends(get_conn),
         user: SimpleUser = Depends(getCurrentUser)):
-    sql = """
-            SELECT id, value
-            FROM project_trade
-            ORDER BY value;
-        """
-
     try:
-        rows = await conn.fetch(sql)
+        rows, _, etag, body = await loadLookup(conn, "project_trade")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    payload = {
-        "project_trades": [
-            {
-                "id": str(r["id"]),
-                "value": r["value"]
-            }
-            for r in rows
-        ]
-    }
-    if user:
-        payload = await encryptForUser(payload, user.email, conn, request.app)
-    return payload
+    cached = notModified(request, response, etag)
+    if cached:
+        return cached
+    return await lookupPayload("project_trades", rows, body, user, conn, request.app)
 
 
 @app.post("/get-project-priorities")
 async def getProjectPriorities(
         request: Request,
-        data: dict = Depends(decryptPayload()),
+        response: Response,
+        data: dict = Depends(decryptPayload),
         conn: Connection = Depends(get_conn),
         user: SimpleUser = Depends(getCurrentUser)):
-    sql = """
-            SELECT id, value, color
-            FROM project_priority
-            ORDER BY value;
-        """
-
     try:
-        rows = await conn.fetch(sql)
+        rows, _, etag, body = await loadLookup(conn, "project_priority")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    payload = {
-        "project_priorities": [
-            {
-                "id": str(r["id"]),
-                "value": r["value"],
-                "color": r["color"]
-            }
-            for r in rows
-        ]
-    }
-    if user:
-        payload = await encryptForUser(payload, user.email, conn, request.app)
-    return payload
+    cached = notModified(request, response, etag)
+    if cached:
+        return cached
+    return await lookupPayload("project_priorities", rows, body, user, conn, request.app)
 
 
 @app.post("/get-all-client-admins")
 async def getAllClientAdmins(
         request: Request,
-        data: dict = Depends(decryptPayload()),
+        data: dict = Depends(decryptPayload),
         conn: Connection = Depends(get_conn),
         user: SimpleUser = Depends(getCurrentUser)):
     sql = """
@@ -1396,7 +1921,7 @@ async def getAllClientAdmins(
 @app.post("/get-account-managers")
 async def getAccountManagers(
         request: Request,
-        data: dict = Depends(decryptPayload()),
+        data: dict = Depends(decryptPayload),
         conn: Connection = Depends(get_conn),
         user: SimpleUser = Depends(getCurrentUser)):
     sql = """
@@ -1430,39 +1955,25 @@ async def getAccountManagers(
 @app.post("/get-states")
 async def getStates(
         request: Request,
-        data: dict = Depends(decryptPayload()),
+        response: Response,
+        data: dict = Depends(decryptPayload),
         conn: Connection = Depends(get_conn),
         user: SimpleUser = Depends(getCurrentUser)):
-    sql = """
-            SELECT id, name
-              FROM state
-             ORDER BY name;
-        """
     try:
-        rows = await conn.fetch(sql)
+        rows, _, etag, body = await loadLookup(conn, "state")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-
-    payload = {
-        "states": [
-            {
-                "id": str(r["id"]),
-                "name": r["name"]
-            }
-            for r in rows
-        ]
-    }
-
-    if user:
-        payload = await encryptForUser(payload, user.email, conn, request.app)
-    return payload
+    cached = notModified(request, response, etag)
+    if cached:
+        return cached
+    return await lookupPayload("states", rows, body, user, conn, request.app)
 
 
 # List all users for admin page
 @app.post("/get-users")
 async def getUsers(
         request: Request,
-        data: dict = Depends(decryptPayload()),
+        data: dict = Depends(decryptPayload),
         conn: Connection = Depends(get_conn),
         user: SimpleUser = Depends(getCurrentUser)):
     sql = """
@@ -1492,7 +2003,7 @@ async def getUsers(
 @app.post("/create-new-project")
 async def createNewProject(
         request: Request,
-        payload: dict = Depends(decryptPayload()),
+        payload: dict = Depends(decryptPayload),
         conn: Connection = Depends(get_conn),
         user: SimpleUser = Depends(getCurrentUser)
 ):
@@ -1517,55 +2028,43 @@ async def createNewProject(
 
     address = f"{address1} {address2 or ''} {city} {stateName} {zipCode}".strip()
 
-    async with conn.transaction():
-        priorityId = await conn.fetchval(
-            "SELECT id FROM project_priority WHERE value=$1  LIMIT 1;",
-            priorityValue,
-        )
-        tradeId = await conn.fetchval(
-            "SELECT id FROM project_trade WHERE value=$1  LIMIT 1;",
-            tradeValue,
-        )
-        stateId = await conn.fetchval(
-            "SELECT id FROM state WHERE name=$1  LIMIT 1;",
-            stateName,
-        )
-        typeId = await conn.fetchval(
-            "SELECT id FROM project_type WHERE LIMIT 1;"
-        )
-        statusId = await conn.fetchval(
-            "SELECT id FROM status WHERE category='project' AND value='Open'  LIMIT 1;"
-        )
-        projectId = await conn.fetchval(
-            """
-            INSERT INTO project (
-              client_id, priority_id, type_id, address, address_line1, address_line2,
-              city, state_id, zip_code, trade_id, status_id, nte, business_name,
-              due_date, date_received, scope_of_work, special_notes, visit_notes,
-              planned_resolution, material_parts_needed, assignee_id
-            ) VALUES (
-              $1,$2,$3,$4,$5,$6,$7,$8,$9,$10,$11,$12,$13,$14,$15,$16,$17,'','','',$18
-            ) RETURNING id;
-            """,
-            clientId,
-            priorityId,
-            typeId,
-            address,
-            address1,
-            address2,
-            city,
-            stateId,
-            zipCode,
-            tradeId,
-            statusId,
-            nte,
-            businessName,
-            dueDate,
-            dateReceived,
-            scopeOfWork,
-            specialNotes,
-            assigneeId,
-        )
+    # lookups resolve inside the INSERT, so the create is one round trip
+    projectId = await conn.fetchval(
+        """
+        INSERT INTO project (
+          client_id, priority_id, type_id, address, address_line1, address_line2,
+          city, state_id, zip_code, trade_id, status_id, nte, business_name,
+          due_date, date_received, scope_of_work, special_notes, visit_notes,
+          planned_resolution, material_parts_needed, assignee_id
+        ) VALUES (
+          $1,
+          (SELECT id FROM project_priority WHERE value=$2 LIMIT 1),
+          (SELECT id FROM project_type LIMIT 1),
+          $3,$4,$5,$6,
+          (SELECT id FROM state WHERE name=$7 LIMIT 1),
+          $8,
+          (SELECT id FROM project_trade WHERE value=$9 LIMIT 1),
+          (SELECT id FROM status WHERE category='project' AND value='Open' LIMIT 1),
+          $10,$11,$12,$13,$14,$15,'','','',$16
+        ) RETURNING id;
+        """,
+        clientId,
+        priorityValue,
+        address,
+        address1,
+        address2,
+        city,
+        stateName,
+        zipCode,
+        tradeValue,
+        nte,
+        businessName,
+        dueDate,
+        dateReceived,
+        scopeOfWork,
+        specialNotes,
+        assigneeId,
+    )
 
     payloadRes = {"projectId": projectId}
     if user:
@@ -1576,10 +2075,82 @@ async def createNewProject(
 ################################################################################
 # TODO:                        PROJECT VIEW ENDPOINTS                          #
 ################################################################################
+# Only the project itself and the two PK joins go to Postgres; the five
+# lookup columns are resolved from the in-process lookup cache.
+PROJECT_SQL = """
+SELECT
+  p.id,
+  p.client_id,
+  c.company_name                        AS client_company_name,
+  p.business_name,
+  p.date_received,
+  p.priority_id,
+  p.type_id,
+  p.address,
+  p.address_line1,
+  p.address_line2,
+  p.city,
+  p.state_id,
+  p.zip_code,
+  p.trade_id,
+  p.status_id,
+  p.nte,
+  p.due_date,
+  p.scope_of_work,
+  p.special_notes,
+  p.visit_notes,
+  p.planned_resolution,
+  p.material_parts_needed,
+  p.assignee_id,
+  au.full_name                         AS assignee_name,
+  p.created_at,
+  p.updated_at,
+  p.is_deleted
+FROM project p
+JOIN client c   ON c.id = p.client_id
+JOIN "user" au  ON au.id = p.assignee_id
+WHERE p.id = $1
+  AND p.is_deleted = FALSE
+"""
+WARM_STATEMENTS.append(PROJECT_SQL)
+
+
+async def loadProject(conn: CrmConnection, projectId: UUID, roles: list[str]) -> dict | None:
+    stmt = await conn.prepared(PROJECT_SQL)
+    row = await stmt.fetchrow(projectId)
+    if row is None:
+        return None
+    # cache hits don't touch the connection; misses reuse it one at a time
+    priorities = await cachedLookup(conn, "project_priority")
+    types = await cachedLookup(conn, "project_type")
+    states = await cachedLookup(conn, "state")
+    trades = await cachedLookup(conn, "project_trade")
+    statuses = await cachedLookup(conn, "status:project")
+
+    project = dict(row)
+    priority = priorities.get(row["priority_id"])
+    trade = trades.get(row["trade_id"])
+    projectType = types.get(row["type_id"])
+    state = states.get(row["state_id"])
+    projectStatus = statuses.get(row["status_id"])
+    project.update(
+        priority_value=priority and priority["value"],
+        priority_color=priority and priority["color"],
+        type_value=projectType and projectType["value"],
+        state_name=state and state["name"],
+        trade_value=trade and trade["value"],
+        status_value=projectStatus and projectStatus["value"],
+        status_color=projectStatus and projectStatus["color"],
+    )
+    if "client_technician" in roles:
+        project.pop("nte", None)
+    return project
+
+
 @app.post("/get-project")
 async def getProject(
         request: Request,
-        data: dict = Depends(decryptPayload()),
+        data: dict = Depends(decryptPayload),
         conn: Connection = Depends(get_conn),
         user: SimpleUser = Depends(getCurrentUser),
         enforcer: AsyncEnforcer = Depends(getEnforcer)
@@ -1587,106 +2158,13 @@ async def getProject(
     project_id = data.get("projectId")
     if not project_id:
         raise HTTPException(status_code=400, detail="projectId required")
-    sql = """
-        SELECT
-          p.id,
-          p.po_number,
-
-          -- The “client” for a project is actually stored as a user → then join client:
-          p.client_id                            AS client_user_id,
-          cu.first_name || ' ' || cu.last_name   AS client_user_name,
-          cut.name                               AS client_user_type,
-          c.id                                    AS client_id,
-          c.company_name                          AS client_company_name,
-
-          p.business_name,
-          p.date_received,
-
-          p.priority_id,
-          pp.value        AS priority_value,
-          pp.color        AS priority_color,
-
-          p.type_id,
-          pt.value        AS type_value,
-
-          p.address,
-          p.address_line1,
-          p.address_line2,
-          p.city,
-
-          p.state_id,
-          st.name         AS state_name,
-
-          p.zip_code,
-
-          p.trade_id,
-          tr.value        AS trade_value,
-          tr.color        AS trade_color,
-
-          p.status_id,
-          s.value         AS status_value,
-          s.color         AS status_color,
-
-          p.nte,
-          p.due_date,
-
-          p.scope_of_work,
-          p.special_notes,
-          p.visit_notes,
-          p.planned_resolution,
-          p.material_parts_needed,
-
-          p.assignee_id,
-          au.first_name || ' ' || au.last_name AS assignee_name,
-
-          p.created_at,
-          p.updated_at,
-          p.is_deleted
-        FROM project p
-
-          JOIN "user" cu
-            ON cu.id = p.client_id
-           
-
-          LEFT JOIN client c
-            ON c.id = cu.client_id
-           
-           AND cut.name = 'client'
-
-          JOIN project_priority pp
-            ON pp.id = p.priority_id
-           
-
-          JOIN project_type pt
-            ON pt.id = p.type_id
-           
-
-          JOIN state st
-            ON st.id = p.state_id
-           
-
-          JOIN project_trade tr
-            ON tr.id = p.trade_id
-           
-
-          JOIN status s
-            ON s.id = p.status_id
-           AND s.category = 'project'
-           
-
-          JOIN "user" au
-            ON au.id = p.assignee_id
-          WHERE p.id = $1
-        """
+    roles = await userRoles(enforcer, user.email)
     try:
-        row = await conn.fetchrow(sql, UUID(project_id))
+        project = await loadProject(conn, UUID(project_id), roles)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-
-    project = dict(row)
-    roles = await enforcer.get_roles_for_user_in_domain(user.email, "*")
-    if "client_technician" in roles:
-        project.pop("nte", None)
+    if project is None:
+        raise HTTPException(status_code=404, detail=f"Project {project_id} not found")
 
     payload = {"project": project}
     if user:
@@ -1697,7 +2175,7 @@ async def getProject(
 @app.post("/get-messages")
 async def getMessages(
         request: Request,
-        data: dict = Depends(decryptPayload()),
+        data: dict = Depends(decryptPayload),
         conn: Connection = Depends(get_conn),
         user: SimpleUser = Depends(getCurrentUser)
 ):
@@ -1707,68 +2185,16 @@ async def getMessages(
     last_seen_id = data.get("last_seen_id")
     if not projectId or not size:
         raise HTTPException(status_code=400, detail="invalid params")
-    if last_seen_created_at:
-        try:
-            dt = datetime.fromisoformat(last_seen_created_at)
-            cursor_ts = dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
-        except ValueError:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid timestamp: '{last_seen_created_at}'"
-            )
-    else:
-        cursor_ts = datetime.now(timezone.utc)
-
-    max_uuid = UUID("ffffffff-ffff-ffff-ffff-ffffffffffff")
-    cursor_id = last_seen_id or max_uuid
-
-    sql = """
-            SELECT
-              m.id,
-              m.created_at,
-              m.updated_at,
-              m.content,
-              m.sender_id,
-              m.sender_role,
-              u.email       AS sender_email,
-              u.first_name  AS sender_first_name,
-              u.last_name   AS sender_last_name,
-              array_remove(array_agg(mm.user_email), NULL) AS mentions,
-              m.file_attachment_id,
-              COUNT(*) OVER() AS total_count
-            FROM message m
-            JOIN project p ON p.id = m.project_id
-            JOIN "user" u ON u.id = m.sender_id
-            LEFT JOIN message_mention mm ON mm.message_id = m.id
-            WHERE  m.project_id = $1
-              AND (m.created_at, m.id) < ($2::timestamptz, $3::uuid)
-            GROUP BY m.id, u.email, u.first_name, u.last_name
-            ORDER BY m.created_at DESC, m.id DESC
-            LIMIT $4;
-        """
+    cursor_ts, cursor_id = parseCursor(last_seen_created_at, last_seen_id, data.get("cursor"))
 
     try:
-        rows = await conn.fetch(sql, projectId, cursor_ts, cursor_id, size)
+        page = await paginate(conn, "messages", size, cursor_ts, cursor_id, projectId,
+                              includeTotal=wantsTotal(data, last_seen_created_at),
+                              columnar=bool(data.get("columnar")))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-    total = rows[0]["total_count"] if rows else 0
-
-    if rows:
-        last = rows[-1]
-        next_ts = last["created_at"].isoformat()
-        next_id = str(last["id"])
-    else:
-        next_ts = None
-        next_id = None
-
-    payload = {
-        "messages": [dict(r) for r in rows],
-        "total_count": total,
-        "page_size": size,
-        "last_seen_created_at": next_ts,
-        "last_seen_id": next_id,
-    }
+    payload = {"messages": page.pop("rows"), **page}
     if user:
         payload = await encryptForUser(payload, user.email, conn, request.app)
     return payload
@@ -1777,7 +2203,7 @@ async def getMessages(
 @app.post("/fetch-project-quotes")
 async def fetchProjectQuotesEndpoint(
         request: Request,
-        data: dict = Depends(decryptPayload()),
+        data: dict = Depends(decryptPayload),
         conn: Connection = Depends(get_conn),
         user: SimpleUser = Depends(getCurrentUser)
 ):
@@ -1787,71 +2213,16 @@ async def fetchProjectQuotesEndpoint(
     last_seen_id = data.get("last_seen_id")
     if not project_id or not size:
         raise HTTPException(status_code=400, detail="invalid params")
-    if last_seen_created_at:
-        try:
-            dt = datetime.fromisoformat(last_seen_created_at)
-            cursor_ts = dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
-        except ValueError:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid timestamp: '{last_seen_created_at}'"
-            )
-    else:
-        cursor_ts = datetime.now(timezone.utc)
-
-    max_uuid = UUID("ffffffff-ffff-ffff-ffff-ffffffffffff")
-    cursor_id = last_seen_id or max_uuid
-
-    sql = """
-        SELECT
-          q.id                 AS quote_id,
-          q.number             AS number,
-          q.created_at         AS date_created,
-          q.amount             AS amount,
-          s.value              AS status_value,
-          COUNT(*) OVER()      AS total_count
-        FROM quote q
-        JOIN status s
-          ON s.id = q.status_id
-         AND s.category = 'quote'
-         
-          q.project_id = $1
-          
-          AND (q.created_at, q.id) < ($2::timestamptz, $3::uuid)
-        ORDER BY q.created_at DESC, q.id DESC
-        LIMIT $4;
-        """
+    cursor_ts, cursor_id = parseCursor(last_seen_created_at, last_seen_id, data.get("cursor"))
 
     try:
-        rows = await conn.fetch(sql, project_id, cursor_ts, cursor_id, size)
+        page = await paginate(conn, "quotes", size, cursor_ts, cursor_id, project_id,
+                              includeTotal=wantsTotal(data, last_seen_created_at),
+                              columnar=bool(data.get("columnar")))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    total = rows[0]["total_count"] if rows else 0
-
-    if rows:
-        last = rows[-1]
-        next_ts = last["created_at"].isoformat()
-        next_id = str(last["id"])
-    else:
-        next_ts = None
-        next_id = None
 
-    payload = {
-        "quotes": [
-            {
-                "quote_id": r["quote_id"],
-                "number": r["number"],
-                "date_created": r["date_created"],
-                "amount": r["amount"],
-                "status": r["status_value"]
-            }
-            for r in rows
-        ],
-        "total_count": total,
-        "page_size": size,
-        "last_seen_created_at": next_ts,
-        "last_seen_id": next_id,
-    }
+    payload = {"quotes": page.pop("rows"), **page}
     if user:
         payload = await encryptForUser(payload, user.email, conn, request.app)
     return payload
@@ -1860,7 +2231,7 @@ async def fetchProjectQuotesEndpoint(
 @app.post("/fetch-project-documents")
 async def fetchProjectDocumentsEndpoint(
         request: Request,
-        data: dict = Depends(decryptPayload()),
+        data: dict = Depends(decryptPayload),
         conn: Connection = Depends(get_conn),
         user: SimpleUser = Depends(getCurrentUser)
 ):
@@ -1870,66 +2241,73 @@ async def fetchProjectDocumentsEndpoint(
     last_seen_id = data.get("last_seen_id")
     if not project_id or not size:
         raise HTTPException(status_code=400, detail="invalid params")
-    if last_seen_created_at:
-        try:
-            dt = datetime.fromisoformat(last_seen_created_at)
-            cursor_ts = dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
-        except ValueError:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid timestamp: '{last_seen_created_at}'"
-            )
-    else:
-        cursor_ts = datetime.now(timezone.utc)
+    cursor_ts, cursor_id = parseCursor(last_seen_created_at, last_seen_id, data.get("cursor"))
 
-    max_uuid = UUID("ffffffff-ffff-ffff-ffff-ffffffffffff")
-    cursor_id = last_seen_id or max_uuid
+    try:
+        page = await paginate(conn, "project_documents", size, cursor_ts, cursor_id, project_id,
+                              includeTotal=wantsTotal(data, last_seen_created_at),
+                              columnar=bool(data.get("columnar")))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    payload = {"documents": page.pop("rows"), **page}
+    if user:
+        payload = await encryptForUser(payload, user.email, conn, request.app)
+    return payload
 
-    sql = """
-        SELECT
-          d.id                  AS document_id,
-          d.file_name           AS file_name,
-          d.file_extension      AS type,
-          d.document_type       AS document_type,
-          d.created_at          AS date_uploaded,
-          COUNT(*) OVER()       AS total_count
-        FROM document d
-          d.project_id = $1
-          
-          AND (d.created_at, d.id) < ($2::timestamptz, $3::uuid)
-        ORDER BY d.created_at DESC, d.id DESC
-        LIMIT $4;
-        """
 
-    try:
-        rows = await conn.fetch(sql, project_id, cursor_ts, cursor_id, size)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-    total = rows[0]["total_count"] if rows else 0
+# seconds a bundle tab waits for a pooled connection before giving up
+BUNDLE_ACQUIRE_TIMEOUT = 2.0
 
-    if rows:
-        last = rows[-1]
-        next_ts = last["created_at"].isoformat()
-        next_id = str(last["id"])
-    else:
-        next_ts = None
-        next_id = None
+
+@app.post("/fetch-project-bundle")
+async def fetchProjectBundle(
+        request: Request,
+        data: dict = Depends(decryptPayload),
+        conn: Connection = Depends(get_conn),
+        user: SimpleUser = Depends(getCurrentUser),
+        enforcer: AsyncEnforcer = Depends(getEnforcer)
+):
+    project_id = data.get("projectId")
+    if not project_id:
+        raise HTTPException(status_code=400, detail="projectId required")
+    try:
+        projectId = UUID(project_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid projectId")
+    roles = await userRoles(enforcer, user.email)
+    cursor_ts, cursor_id = parseCursor(None, None)
+    pool = request.app.state.db_pool
+
+    # First page of each project tab, each on its own pooled connection so the
+    # round trips overlap instead of running one after another. The handler
+    # already holds a connection, so a bounded wait keeps concurrent bundles
+    # from deadlocking a drained pool; the client gets a 503 and retries.
+    async def firstPage(name: str, size: int) -> dict:
+        async with pool.acquire(timeout=BUNDLE_ACQUIRE_TIMEOUT) as c:
+            return await paginate(c, name, size, cursor_ts, cursor_id, projectId)
+
+    # a TaskGroup cancels the sibling queries (and frees their connections)
+    # as soon as one of them fails, where gather would let them run on
+    try:
+        async with asyncio.TaskGroup() as tg:
+            projectTask = tg.create_task(loadProject(conn, projectId, roles))
+            messagesTask = tg.create_task(firstPage("messages", 20))
+            quotesTask = tg.create_task(firstPage("quotes", 10))
+            documentsTask = tg.create_task(firstPage("project_documents", 10))
+    except ExceptionGroup as eg:
+        if eg.subgroup(TimeoutError):
+            raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Database busy")
+        raise HTTPException(status_code=500, detail=str(eg.exceptions[0]))
+    project = projectTask.result()
+    if project is None:
+        raise HTTPException(status_code=404, detail=f"Project {project_id} not found")
 
     payload = {
-        "documents": [
-            {
-                "document_id": r["document_id"],
-                "title": r["file_name"],
-                "type": r["type"],
-                "document_type": r["document_type"],
-                "date_uploaded": r["date_uploaded"]
-            }
-            for r in rows
-        ],
-        "total_count": total,
-        "page_size": size,
-        "last_seen_created_at": next_ts,
-        "last_seen_id": next_id,
+        "project": project,
+        "messages": messagesTask.result(),
+        "quotes": quotesTask.result(),
+        "documents": documentsTask.result(),
     }
     if user:
         payload = await encryptForUser(payload, user.email, conn, request.app)
@@ -1943,9 +2321,9 @@ async def fetchProjectDocumentsEndpoint(
 @app.post("/get-clients")
 async def getClients(
         request: Request,
-        data: dict = Depends(decryptPayload()),
+        data: dict = Depends(decryptPayload),
         size: int = Query(..., gt=0, description="Number of clients per page"),
-        last_seen_created_at: Optional[str] = Query(
+        last_seen_created_at: Optional[datetime] = Query(
             None,
             description="ISO-8601 UTC timestamp cursor (e.g. 2025-05-24T12:00:00Z)"
         ),
@@ -1959,68 +2337,16 @@ async def getClients(
     size = data.get("size", size)
     last_seen_created_at = data.get("last_seen_created_at", last_seen_created_at)
     last_seen_id = data.get("last_seen_id", last_seen_id)
-    if last_seen_created_at:
-        try:
-            dt = datetime.fromisoformat(last_seen_created_at)
-            cursor_ts = dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
-        except ValueError:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid timestamp: '{last_seen_created_at}'"
-            )
-    else:
-        cursor_ts = datetime.now(timezone.utc)
-
-    max_uuid = UUID("ffffffff-ffff-ffff-ffff-ffffffffffff")
-    cursor_id = last_seen_id or max_uuid
-
-    sql = """
-            SELECT
-              c.id,
-              c.company_name,
-              ct.value AS type_value,
-              c.status_id,
-              s.value AS status_value,
-              COALESCE(ca.total_collected, 0) AS total_revenue,
-              COUNT(*) OVER() AS total_count
-            FROM client c
-            JOIN status s
-              ON s.id = c.status_id
-             AND s.category = 'client'
-             
-            JOIN client_type ct
-              ON ct.id = c.type_id
-             
-            LEFT JOIN client_aggregates ca
-              ON ca.client_id = c.id
-            WHERE (c.created_at, c.id) < ($1::timestamptz, $2::uuid)
-              
-            ORDER BY c.created_at DESC, c.id DESC
-            LIMIT $3;
-        """
+    cursor_ts, cursor_id = parseCursor(last_seen_created_at, last_seen_id, data.get("cursor"))
 
     try:
-        rows = await conn.fetch(sql, cursor_ts, cursor_id, size)
+        page = await paginate(conn, "clients", size, cursor_ts, cursor_id,
+                              includeTotal=wantsTotal(data, last_seen_created_at),
+                              columnar=bool(data.get("columnar")))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-    total = rows[0]["total_count"] if rows else 0
-
-    if rows:
-        last = rows[-1]
-        next_ts = last["created_at"].isoformat()
-        next_id = str(last["id"])
-    else:
-        next_ts = None
-        next_id = None
-
-    payload = {
-        "clients": [dict(r) for r in rows],
-        "total_count": total,
-        "page_size": size,
-        "last_seen_created_at": next_ts,
-        "last_seen_id": next_id,
-    }
+    payload = {"clients": page.pop("rows"), **page}
     if user:
         payload = await encryptForUser(payload, user.email, conn, request.app)
     return payload
@@ -2029,75 +2355,58 @@ async def getClients(
 @app.post("/get-client-types")
 async def getClientTypes(
         request: Request,
-        data: dict = Depends(decryptPayload()),
+        response: Response,
+        data: dict = Depends(decryptPayload),
         conn: Connection = Depends(get_conn),
         user: SimpleUser = Depends(getCurrentUser)):
-    sql = """
-            SELECT id, value
-            FROM client_type
-            ORDER BY value;
-        """
-
     try:
-        rows = await conn.fetch(sql)
+        rows, _, etag, body = await loadLookup(conn, "client_type")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    payload = {"client_types": [dict(r) for r in rows]}
-    if user:
-        payload = await encryptForUser(payload, user.email, conn, request.app)
-    return payload
+    cached = notModified(request, response, etag)
+    if cached:
+        return cached
+    return await lookupPayload("client_types", rows, body, user, conn, request.app)
 
 
 @app.post("/get-pay-terms")
 async def getPayTerms(
         request: Request,
-        data: dict = Depends(decryptPayload()),
+        response: Response,
+        data: dict = Depends(decryptPayload),
         conn: Connection = Depends(get_conn),
         user: SimpleUser = Depends(getCurrentUser)):
-    sql = """
-            SELECT id, value
-              FROM pay_term
-             ORDER BY value;
-        """
-
     try:
-        rows = await conn.fetch(sql)
+        rows, _, etag, body = await loadLookup(conn, "pay_term")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    payload = {"pay_terms": [dict(r) for r in rows]}
-    if user:
-        payload = await encryptForUser(payload, user.email, conn, request.app)
-    return payload
+    cached = notModified(request, response, etag)
+    if cached:
+        return cached
+    return await lookupPayload("pay_terms", rows, body, user, conn, request.app)
 
 
 @app.post("/get-client-statuses")
 async def getClientStatuses(
         request: Request,
-        data: dict = Depends(decryptPayload()),
+        response: Response,
+        data: dict = Depends(decryptPayload),
         conn: Connection = Depends(get_conn),
         user: SimpleUser = Depends(getCurrentUser)):
-    sql = """
-            SELECT id, value, color
-            FROM status
-            WHERE category = 'client'
-              
-            ORDER BY value;
-        """
-
     try:
-        rows = await conn.fetch(sql)
+        rows, _, etag, body = await loadLookup(conn, "status:client")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    payload = {"client_statuses": [dict(r) for r in rows]}
-    if user:
-        payload = await encryptForUser(payload, user.email, conn, request.app)
-    return payload
+    cached = notModified(request, response, etag)
+    if cached:
+        return cached
+    return await lookupPayload("client_statuses", rows, body, user, conn, request.app)
 
 
 @app.post("/create-new-client")
 async def createNewClient(
         request: Request,
-        payload: dict = Depends(decryptPayload()),
+        payload: dict = Depends(decryptPayload),
         conn: Connection = Depends(get_conn),
         user: SimpleUser = Depends(getCurrentUser)
 ):
@@ -2192,7 +2501,7 @@ async def createNewClient(
 async def fetchClient(
         request: Request,
         client_id: str = Query(..., description="Client UUID"),
-        data: dict = Depends(decryptPayload()),
+        data: dict = Depends(decryptPayload),
         conn: Connection = Depends(get_conn),
         user: SimpleUser = Depends(getCurrentUser)
 ):
@@ -2222,7 +2531,7 @@ async def fetchClient(
     if not row:
         raise HTTPException(status_code=404, detail=f"Client {client_id} not found")
 
-    payload = {"client": dict(row)}
+    payload = {"client": row}
     if user:
         payload = await encryptForUser(payload, user.email, conn, request.app)
     return payload
@@ -2234,7 +2543,7 @@ async def fetchClientInvoices(
         client_id: str = Query(..., description="Client UUID"),
         size: int = Query(..., gt=0, description="Number of invoices to return"),
         q: Optional[str] = Query(None, description="Search query"),
-        last_seen_created_at: Optional[str] = Query(
+        last_seen_created_at: Optional[datetime] = Query(
             None,
             description="ISO-8601 UTC timestamp cursor (e.g. 2025-05-24T12:00:00Z)"
         ),
@@ -2242,7 +2551,7 @@ async def fetchClientInvoices(
             None,
             description="UUID cursor to break ties if multiple rows share the same timestamp"
         ),
-        data: dict = Depends(decryptPayload()),
+        data: dict = Depends(decryptPayload),
         conn: Connection = Depends(get_conn),
         user: SimpleUser = Depends(getCurrentUser)
 ):
@@ -2250,62 +2559,16 @@ async def fetchClientInvoices(
     q = data.get("q", q)
     last_seen_created_at = data.get("last_seen_created_at", last_seen_created_at)
     last_seen_id = data.get("last_seen_id", last_seen_id)
-    if last_seen_created_at:
-        try:
-            dt = datetime.fromisoformat(last_seen_created_at)
-            cursor_ts = dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
-        except ValueError:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid timestamp: '{last_seen_created_at}'"
-            )
-    else:
-        cursor_ts = datetime.now(timezone.utc)
-
-    max_uuid = UUID("ffffffff-ffff-ffff-ffff-ffffffffffff")
-    cursor_id = last_seen_id or max_uuid
-
-    sql = """
-        SELECT
-          i.id            AS invoice_id,
-          i.number        AS number,
-          i.created_at    AS date_created,
-          i.issuance_date AS issuance_date,
-          i.amount        AS amount,
-          s.value         AS status_value,
-          COUNT(*) OVER() AS total_count
-        FROM invoice i
-        JOIN status s ON s.id = i.status_id AND s.category = 'invoice' 
-          i.client_id = $1
-          
-          AND (i.created_at, i.id) < ($2::timestamptz, $3::uuid)
-          AND ($4::text IS NULL OR i.number::text ILIKE '%' || $4 || '%')
-        ORDER BY i.created_at DESC, i.id DESC
-        LIMIT $5;
-    """
+    cursor_ts, cursor_id = parseCursor(last_seen_created_at, last_seen_id, data.get("cursor"))
 
     try:
-        rows = await conn.fetch(sql, client_id, cursor_ts, cursor_id, q, size)
+        page = await paginate(conn, "client_invoices", size, cursor_ts, cursor_id, client_id, q,
+                              includeTotal=wantsTotal(data, last_seen_created_at),
+                              columnar=bool(data.get("columnar")))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-    total = rows[0]["total_count"] if rows else 0
-
-    if rows:
-        last = rows[-1]
-        next_ts = last["created_at"].isoformat()
-        next_id = str(last["id"])
-    else:
-        next_ts = None
-        next_id = None
-
-    payload = {
-        "invoices": [dict(r) for r in rows],
-        "total_count": total,
-        "page_size": size,
-        "last_seen_created_at": next_ts,
-        "last_seen_id": next_id,
-    }
+    payload = {"invoices": page.pop("rows"), **page}
     if user:
         payload = await encryptForUser(payload, user.email, conn, request.app)
     return payload
@@ -2314,11 +2577,11 @@ async def fetchClientInvoices(
 @app.post("/fetch-client-onboarding-documents")
 async def fetchClientOnboardingDocuments(
         request: Request,
-        data: dict = Depends(decryptPayload()),
+        data: dict = Depends(decryptPayload),
         client_id: Optional[str] = Query(None, description="Client UUID"),
         size: Optional[int] = Query(None, gt=0, description="Number of documents to return"),
         q: Optional[str] = Query(None, description="Search query"),
-        last_seen_created_at: Optional[str] = Query(
+        last_seen_created_at: Optional[datetime] = Query(
             None,
             description="ISO-8601 UTC timestamp cursor (e.g. 2025-05-24T12:00:00Z)"
         ),
@@ -2334,70 +2597,16 @@ async def fetchClientOnboardingDocuments(
     q = data.get("q", q)
     last_seen_created_at = data.get("last_seen_created_at", last_seen_created_at)
     last_seen_id = data.get("last_seen_id", last_seen_id)
-    if last_seen_created_at:
-        try:
-            dt = datetime.fromisoformat(last_seen_created_at)
-            cursor_ts = dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
-        except ValueError:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid timestamp: '{last_seen_created_at}'"
-            )
-    else:
-        cursor_ts = datetime.now(timezone.utc)
-
-    max_uuid = UUID("ffffffff-ffff-ffff-ffff-ffffffffffff")
-    cursor_id = last_seen_id or max_uuid
-
-    sql = """
-        SELECT
-          d.id             AS document_id,
-          d.file_name      AS file_name,
-          d.file_extension AS type,
-          d.document_type  AS document_type,
-          d.created_at     AS date_uploaded,
-          COUNT(*) OVER()  AS total_count
-        FROM document d
-          d.client_id = $1
-          AND d.purpose = 'onboarding_paperwork'
-          
-          AND (d.created_at, d.id) < ($2::timestamptz, $3::uuid)
-          AND ($4::text IS NULL OR d.file_name ILIKE '%' || $4 || '%')
-        ORDER BY d.created_at DESC, d.id DESC
-        LIMIT $5;
-    """
+    cursor_ts, cursor_id = parseCursor(last_seen_created_at, last_seen_id, data.get("cursor"))
 
     try:
-        rows = await conn.fetch(sql, client_id, cursor_ts, cursor_id, q, size)
+        page = await paginate(conn, "onboarding_documents", size, cursor_ts, cursor_id, client_id, q,
+                              includeTotal=wantsTotal(data, last_seen_created_at),
+                              columnar=bool(data.get("columnar")))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-    total = rows[0]["total_count"] if rows else 0
-
-    if rows:
-        last = rows[-1]
-        next_ts = last["created_at"].isoformat()
-        next_id = str(last["id"])
-    else:
-        next_ts = None
-        next_id = None
-
-    payload = {
-        "documents": [
-            {
-                "document_id": r["document_id"],
-                "title": r["file_name"],
-                "type": r["type"],
-                "document_type": r["document_type"],
-                "date_uploaded": r["date_uploaded"]
-            }
-            for r in rows
-        ],
-        "total_count": total,
-        "page_size": size,
-        "last_seen_created_at": next_ts,
-        "last_seen_id": next_id,
-    }
+    payload = {"documents": page.pop("rows"), **page}
     if user:
         payload = await encryptForUser(payload, user.email, conn, request.app)
     return payload
@@ -2406,11 +2615,11 @@ async def fetchClientOnboardingDocuments(
 @app.post("/get-insurance-documents")
 async def getInsuranceDocuments(
         request: Request,
-        data: dict = Depends(decryptPayload()),
+        data: dict = Depends(decryptPayload),
         client_id: Optional[str] = Query(None, description="Client UUID"),
         size: Optional[int] = Query(None, gt=0, description="Number of documents to return"),
         q: Optional[str] = Query(None, description="Search query"),
-        last_seen_created_at: Optional[str] = Query(
+        last_seen_created_at: Optional[datetime] = Query(
             None,
             description="ISO-8601 UTC timestamp cursor (e.g. 2025-05-24T12:00:00Z)"
         ),
@@ -2426,67 +2635,16 @@ async def getInsuranceDocuments(
     q = data.get("q", q)
     last_seen_created_at = data.get("last_seen_created_at", last_seen_created_at)
     last_seen_id = data.get("last_seen_id", last_seen_id)
-    if last_seen_created_at:
-        try:
-            dt = datetime.fromisoformat(last_seen_created_at)
-            cursor_ts = dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
-        except ValueError:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid timestamp: '{last_seen_created_at}'"
-            )
-    else:
-        cursor_ts = datetime.now(timezone.utc)
-
-    max_uuid = UUID("ffffffff-ffff-ffff-ffff-ffffffffffff")
-    cursor_id = last_seen_id or max_uuid
-
-    sql = """
-        SELECT
-          d.id             AS document_id,
-          d.file_name      AS file_name,
-          d.file_extension AS type,
-          d.document_type  AS document_type,
-          d.created_at     AS date_uploaded,
-          COUNT(*) OVER()  AS total_count
-        FROM document d
-          d.client_id = $1
-          AND d.purpose = 'insurance'
-          
-          AND (d.created_at, d.id) < ($2::timestamptz, $3::uuid)
-          AND ($4::text IS NULL OR d.file_name ILIKE '%' || $4 || '%')
-        ORDER BY d.created_at DESC, d.id DESC
-        LIMIT $5;
-    """
-
-    rows = await conn.fetch(sql, client_id, cursor_ts, cursor_id, q, size)
+    cursor_ts, cursor_id = parseCursor(last_seen_created_at, last_seen_id, data.get("cursor"))
 
-    total = rows[0]["total_count"] if rows else 0
-
-    if rows:
-        last = rows[-1]
-        next_ts = last["created_at"].isoformat()
-        next_id = str(last["id"])
-    else:
-        next_ts = None
-        next_id = None
+    try:
+        page = await paginate(conn, "insurance_documents", size, cursor_ts, cursor_id, client_id, q,
+                              includeTotal=wantsTotal(data, last_seen_created_at),
+                              columnar=bool(data.get("columnar")))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-    payload = {
-        "documents": [
-            {
-                "document_id": r["document_id"],
-                "title": r["file_name"],
-                "type": r["type"],
-                "document_type": r["document_type"],
-                "date_uploaded": r["date_uploaded"]
-            }
-            for r in rows
-        ],
-        "total_count": total,
-        "page_size": size,
-        "last_seen_created_at": next_ts,
-        "last_seen_id": next_id,
-    }
+    payload = {"documents": page.pop("rows"), **page}
     if user:
         payload = await encryptForUser(payload, user.email, conn, request.app)
     return payload
@@ -2498,7 +2656,7 @@ async def fetchClientProjects(
         client_id: str = Query(..., description="Client UUID"),
         size: int = Query(..., gt=0, description="Number of projects to return"),
         q: Optional[str] = Query(None, description="Search query"),
-        last_seen_created_at: Optional[str] = Query(
+        last_seen_created_at: Optional[datetime] = Query(
             None,
             description="ISO-8601 UTC timestamp cursor (e.g. 2025-05-24T12:00:00Z)"
         ),
@@ -2506,7 +2664,7 @@ async def fetchClientProjects(
             None,
             description="UUID cursor to break ties if multiple rows share the same timestamp"
         ),
-        data: dict = Depends(decryptPayload()),
+        data: dict = Depends(decryptPayload),
         conn: Connection = Depends(get_conn),
         user: SimpleUser = Depends(getCurrentUser)
 ):
@@ -2514,61 +2672,16 @@ async def fetchClientProjects(
     q = data.get("q", q)
     last_seen_created_at = data.get("last_seen_created_at", last_seen_created_at)
     last_seen_id = data.get("last_seen_id", last_seen_id)
-    if last_seen_created_at:
-        try:
-            dt = datetime.fromisoformat(last_seen_created_at)
-            cursor_ts = dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
-        except ValueError:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid timestamp: '{last_seen_created_at}'"
-            )
-    else:
-        cursor_ts = datetime.now(timezone.utc)
-
-    max_uuid = UUID("ffffffff-ffff-ffff-ffff-ffffffffffff")
-    cursor_id = last_seen_id or max_uuid
-
-    sql = """
-        SELECT
-          p.id            AS project_id,
-          p.business_name AS business_name,
-          p.created_at    AS date_created,
-          p.due_date      AS due_date,
-          s.value         AS status_value,
-          COUNT(*) OVER() AS total_count
-        FROM project p
-        JOIN status s ON s.id = p.status_id AND s.category = 'project' 
-          p.client_id = $1
-          AND s.value = 'Open'
-          
-          AND (p.created_at, p.id) < ($2::timestamptz, $3::uuid)
-          AND ($4::text IS NULL OR p.business_name ILIKE '%' || $4 || '%')
-        ORDER BY p.created_at DESC, p.id DESC
-        LIMIT $5;
-    """
+    cursor_ts, cursor_id = parseCursor(last_seen_created_at, last_seen_id, data.get("cursor"))
 
     try:
-        rows = await conn.fetch(sql, client_id, cursor_ts, cursor_id, q, size)
+        page = await paginate(conn, "client_projects", size, cursor_ts, cursor_id, client_id, q,
+                              includeTotal=wantsTotal(data, last_seen_created_at),
+                              columnar=bool(data.get("columnar")))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-    total = rows[0]["total_count"] if rows else 0
-    if rows:
-        last = rows[-1]
-        next_ts = last["created_at"].isoformat()
-        next_id = str(last["id"])
-    else:
-        next_ts = None
-        next_id = None
-
-    payload = {
-        "projects": [dict(r) for r in rows],
-        "total_count": total,
-        "page_size": size,
-        "last_seen_created_at": next_ts,
-        "last_seen_id": next_id,
-    }
+    payload = {"projects": page.pop("rows"), **page}
     if user:
         payload = await encryptForUser(payload, user.email, conn, request.app)
     return payload
@@ -2583,7 +2696,7 @@ async def fetchClientProjects(
 async def getBillings(
         request: Request,
         size: int = Query(..., gt=0, description="Number of invoices per page"),
-        lastSeenCreatedAt: Optional[str] = Query(
+        lastSeenCreatedAt: Optional[datetime] = Query(
             None,
             description="ISO-8601 UTC timestamp cursor (e.g. 2025-05-24T12:00:00Z)"
         ),
@@ -2591,78 +2704,23 @@ async def getBillings(
             None,
             description="UUID cursor to break ties if multiple rows share the same timestamp"
         ),
-        data: dict = Depends(decryptPayload()),
+        data: dict = Depends(decryptPayload),
         conn: Connection = Depends(get_conn),
         user: SimpleUser = Depends(getCurrentUser)
 ):
     size = data.get("size", size)
     lastSeenCreatedAt = data.get("last_seen_created_at", lastSeenCreatedAt)
     lastSeenId = data.get("last_seen_id", lastSeenId)
-    if lastSeenCreatedAt:
-        try:
-            dt = datetime.fromisoformat(lastSeenCreatedAt)
-            cursorTs = dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
-        except ValueError:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid timestamp: '{lastSeenCreatedAt}'"
-            )
-    else:
-        cursorTs = datetime.now(timezone.utc)
-
-    maxUuid = UUID("ffffffff-ffff-ffff-ffff-ffffffffffff")
-    cursorId = lastSeenId or maxUuid
-
-    sql = """
-        SELECT
-          i.id,
-          i.number,
-          i.issuance_date,
-          i.due_date,
-          i.amount,
-          s.value        AS status_value,
-          d.file_url,
-          d.file_name,
-          d.file_extension,
-          d.document_type,
-          i.created_at,
-          COUNT(*) OVER() AS total_count
-        FROM invoice i
-        JOIN status s
-          ON s.id = i.status_id
-         AND s.category = 'billing'
-         
-        LEFT JOIN document d
-          ON d.id = i.file_id
-         
-        WHERE (i.created_at, i.id) < ($1::timestamptz, $2::uuid)
-          
-        ORDER BY i.created_at DESC, i.id DESC
-        LIMIT $3;
-    """
+    cursorTs, cursorId = parseCursor(lastSeenCreatedAt, lastSeenId, data.get("cursor"))
 
     try:
-        rows = await conn.fetch(sql, cursorTs, cursorId, size)
+        page = await paginate(conn, "billings", size, cursorTs, cursorId,
+                              includeTotal=wantsTotal(data, lastSeenCreatedAt),
+                              columnar=bool(data.get("columnar")))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-    total = rows[0]["total_count"] if rows else 0
-
-    if rows:
-        last = rows[-1]
-        nextTs = last["created_at"].isoformat()
-        nextId = str(last["id"])
-    else:
-        nextTs = None
-        nextId = None
-
-    payload = {
-        "billings": [dict(r) for r in rows],
-        "total_count": total,
-        "page_size": size,
-        "last_seen_created_at": nextTs,
-        "last_seen_id": nextId,
-    }
+    payload = {"billings": page.pop("rows"), **page}
     if user:
         payload = await encryptForUser(payload, user.email, conn, request.app)
     return payload
@@ -2671,71 +2729,52 @@ async def getBillings(
 @app.post("/get-billing-statuses")
 async def getBillingStatuses(
         request: Request,
-        data: dict = Depends(decryptPayload()),
+        response: Response,
+        data: dict = Depends(decryptPayload),
         conn: Connection = Depends(get_conn),
         user: SimpleUser = Depends(getCurrentUser)):
-    sql = """
-            SELECT id, value, color
-            FROM status
-            WHERE category = 'billing'
-              
-            ORDER BY value;
-        """
-
     try:
-        rows = await conn.fetch(sql)
+        rows, _, etag, body = await loadLookup(conn, "status:billing")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    payload = {"billing_statuses": [dict(r) for r in rows]}
-    if user:
-        payload = await encryptForUser(payload, user.email, conn, request.app)
-    return payload
+    cached = notModified(request, response, etag)
+    if cached:
+        return cached
+    return await lookupPayload("billing_statuses", rows, body, user, conn, request.app)
 
 
 @app.post("/get-invoice-statuses")
 async def getInvoiceStatuses(
         request: Request,
-        data: dict = Depends(decryptPayload()),
+        response: Response,
+        data: dict = Depends(decryptPayload),
         conn: Connection = Depends(get_conn),
         user: SimpleUser = Depends(getCurrentUser)):
-    sql = """
-            SELECT id, value, color
-              FROM status
-             WHERE category = 'invoice'
-               
-             ORDER BY value;
-        """
     try:
-        rows = await conn.fetch(sql)
+        rows, _, etag, body = await loadLookup(conn, "status:invoice")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    payload = {"invoice_statuses": [dict(r) for r in rows]}
-    if user:
-        payload = await encryptForUser(payload, user.email, conn, request.app)
-    return payload
+    cached = notModified(request, response, etag)
+    if cached:
+        return cached
+    return await lookupPayload("invoice_statuses", rows, body, user, conn, request.app)
 
 
 @app.post("/get-quote-statuses")
 async def getQuoteStatuses(
         request: Request,
-        data: dict = Depends(decryptPayload()),
+        response: Response,
+        data: dict = Depends(decryptPayload),
         conn: Connection = Depends(get_conn),
         user: SimpleUser = Depends(getCurrentUser)):
-    sql = """
-            SELECT id, value, color
-              FROM status
-             WHERE category = 'quote'
-               
-             ORDER BY value;
-        """
     try:
-        rows = await conn.fetch(sql)
+        rows, _, etag, body = await loadLookup(conn, "status:quote")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    payload = {"quote_statuses": [dict(r) for r in rows]}
-    if user:
-        payload = await encryptForUser(payload, user.email, conn, request.app)
-    return payload
+    cached = notModified(request, response, etag)
+    if cached:
+        return cached
+    return await lookupPayload("quote_statuses", rows, body, user, conn, request.app)
 
 
 @app.post("/get-passwords")
@@ -2743,7 +2782,7 @@ async def getPasswords(
         request: Request,
         clientId: str = Query(..., description="Client UUID"),
         size: int = Query(..., gt=0, description="Number of passwords per page"),
-        lastSeenCreatedAt: Optional[str] = Query(
+        lastSeenCreatedAt: Optional[datetime] = Query(
             None,
             description="ISO-8601 UTC timestamp cursor (e.g. 2025-05-24T12:00:00Z)"
         ),
@@ -2751,62 +2790,24 @@ async def getPasswords(
             None,
             description="UUID cursor to break ties if multiple rows share the same timestamp"
         ),
-        data: dict = Depends(decryptPayload()),
+        data: dict = Depends(decryptPayload),
         conn: Connection = Depends(get_conn),
         user: SimpleUser = Depends(getCurrentUser)
 ):
     size = data.get("size", size)
     lastSeenCreatedAt = data.get("last_seen_created_at", lastSeenCreatedAt)
     lastSeenUserId = data.get("last_seen_user_id", lastSeenUserId)
-    if lastSeenCreatedAt:
-        try:
-            dt = datetime.fromisoformat(lastSeenCreatedAt)
-            cursorTs = dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
-        except ValueError:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Invalid timestamp: '{lastSeenCreatedAt}'"
-            )
-    else:
-        cursorTs = datetime.now(timezone.utc)
-
-    maxUuid = UUID("ffffffff-ffff-ffff-ffff-ffffffffffff")
-    cursorId = lastSeenUserId or maxUuid
-
-    sql = """
-        SELECT
-          p.user_id,
-          p.encrypted_password,
-          p.iv,
-          p.salt,
-          p.kdf_params,
-          p.created_at,
-          COUNT(*) OVER() AS total_count
-        FROM client_password p
-        WHERE p.client_id = $1
-          AND (p.created_at, p.user_id) < ($2::timestamptz, $3::uuid)
-        ORDER BY p.created_at DESC, p.user_id DESC
-        LIMIT $4;
-    """
-
-    rows = await conn.fetch(sql, clientId, cursorTs, cursorId, size)
+    cursorTs, cursorId = parseCursor(lastSeenCreatedAt, lastSeenUserId, data.get("cursor"))
 
-    total = rows[0]["total_count"] if rows else 0
-    if rows:
-        last = rows[-1]
-        nextTs = last["created_at"].isoformat()
-        nextId = str(last["user_id"])
-    else:
-        nextTs = None
-        nextId = None
+    try:
+        page = await paginate(conn, "passwords", size, cursorTs, cursorId, clientId,
+                              includeTotal=wantsTotal(data, lastSeenCreatedAt),
+                              columnar=bool(data.get("columnar")))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-    payload = {
-        "passwords": [dict(r) for r in rows],
-        "total_count": total,
-        "page_size": size,
-        "last_seen_created_at": nextTs,
-        "last_seen_user_id": nextId,
-    }
+    payload = {"passwords": page.pop("rows"), **page}
+    payload["last_seen_user_id"] = payload.pop("last_seen_id")
     if user:
         payload = await encryptForUser(payload, user.email, conn, request.app)
     return payload
@@ -2815,7 +2816,7 @@ async def getPasswords(
 @app.post("/create-new-invoice")
 async def createNewInvoice(
         request: Request,
-        payload: dict = Depends(decryptPayload()),
+        payload: dict = Depends(decryptPayload),
         conn: Connection = Depends(get_conn),
         user: SimpleUser = Depends(getCurrentUser)
 ):
@@ -2876,7 +2877,7 @@ async def createNewInvoice(
 @app.post("/create-new-quote")
 async def createNewQuote(
         request: Request,
-        payload: dict = Depends(decryptPayload()),
+        payload: dict = Depends(decryptPayload),
         conn: Connection = Depends(get_conn),
         user: SimpleUser = Depends(getCurrentUser)
 ):
@@ -2935,7 +2936,7 @@ async def createNewQuote(
 async def getInvoice(
         request: Request,
         id: str = Query(..., description="Invoice UUID"),
-        data: dict = Depends(decryptPayload()),
+        data: dict = Depends(decryptPayload),
         conn: Connection = Depends(get_conn),
         user: SimpleUser = Depends(getCurrentUser)
 ):
@@ -2949,7 +2950,7 @@ async def getInvoice(
     row = await conn.fetchrow(sql, id)
     if not row:
         raise HTTPException(status_code=404, detail=f"Invoice {id} not found")
-    payload = {"invoice": dict(row)}
+    payload = {"invoice": row}
     if user:
         payload = await encryptForUser(payload, user.email, conn, request.app)
     return payload
@@ -2959,7 +2960,7 @@ async def getInvoice(
 async def getQuote(
         request: Request,
         id: str = Query(..., description="Quote UUID"),
-        data: dict = Depends(decryptPayload()),
+        data: dict = Depends(decryptPayload),
         conn: Connection = Depends(get_conn),
         user: SimpleUser = Depends(getCurrentUser)
 ):
@@ -2973,7 +2974,7 @@ async def getQuote(
     row = await conn.fetchrow(sql, id)
     if not row:
         raise HTTPException(status_code=404, detail=f"Quote {id} not found")
-    payload = {"quote": dict(row)}
+    payload = {"quote": row}
     if user:
         payload = await encryptForUser(payload, user.email, conn, request.app)
     return payload
@@ -2986,7 +2987,7 @@ async def getQuote(
 @app.post("/get-onboarding-data")
 async def getOnboardingData(
         request: Request,
-        data: dict = Depends(decryptPayload()),
+        data: dict = Depends(decryptPayload),
         clientId: Optional[str] = Query(None, description="Client UUID"),
         conn: Connection = Depends(get_conn),
         user: SimpleUser = Depends(getCurrentUser)
@@ -3056,13 +3057,13 @@ async def getOnboardingData(
         raise HTTPException(status_code=500, detail=str(e))
 
     payload = {
-        "general": dict(generalRow) if generalRow else {},
-        "service": dict(serviceRow) if serviceRow else {},
-        "contact": dict(contactRow) if contactRow else {},
-        "load": dict(loadRow) if loadRow else {},
-        "tradeCoverage": [dict(r) for r in tradeRows],
-        "pricing": [dict(r) for r in pricingRows],
-        "references": [dict(r) for r in refsRows],
+        "general": generalRow or {},
+        "service": serviceRow or {},
+        "contact": contactRow or {},
+        "load": loadRow or {},
+        "tradeCoverage": tradeRows,
+        "pricing": pricingRows,
+        "references": refsRows,
     }
     if user:
         payload = await encryptForUser(payload, user.email, conn, request.app)
@@ -3074,10 +3075,63 @@ async def getOnboardingData(
 ################################################################################
 
 
+# Runs inside saveOnboardingData's transaction, so the whole submission is
+# stored or none of it is.
+async def saveOnboardingDetails(conn: Connection, clientId: UUID, tradeCoverage: list[dict], pricing: list[dict],
+                                references: list[dict]):
+    # one set-oriented statement per table however many rows the client sent
+    if tradeCoverage:
+        await conn.execute(
+            """
+            INSERT INTO client_trade_coverage (
+              client_id, project_trade_id, coverage_level
+            )
+            SELECT $1, pt.id, t.lvl
+            FROM unnest($2::text[], $3::text[]) AS t(val, lvl)
+            JOIN project_trade pt ON pt.value = t.val;
+            """,
+            clientId,
+            [tc["trade"] for tc in tradeCoverage],
+            [tc["coverageLevel"].upper() for tc in tradeCoverage],
+        )
+
+    if pricing:
+        await conn.execute(
+            """
+            INSERT INTO client_pricing_structure (
+              client_id, item_label, regular_hours_rate, after_hours_rate, is_custom
+            )
+            SELECT $1, t.label, t.regular, t.after, t.custom
+            FROM unnest($2::text[], $3::text[], $4::text[], $5::boolean[]) AS t(label, regular, after, custom);
+            """,
+            clientId,
+            [price["label"] for price in pricing],
+            [price.get("regular") for price in pricing],
+            [price.get("after") for price in pricing],
+            [bool(price.get("isCustom")) for price in pricing],
+        )
+
+    if references:
+        await conn.execute(
+            """
+            INSERT INTO client_references (
+              client_id, company_name, contact_name, contact_email, contact_phone
+            )
+            SELECT $1, t.company, t.contact, t.email, t.phone
+            FROM unnest($2::text[], $3::text[], $4::text[], $5::text[]) AS t(company, contact, email, phone);
+            """,
+            clientId,
+            [ref.get("company") for ref in references],
+            [ref.get("contact") for ref in references],
+            [ref.get("email") for ref in references],
+            [ref.get("phone") for ref in references],
+        )
+
+
 @app.post("/save-onboarding-data")
 async def saveOnboardingData(
         request: Request,
-        payload: dict = Depends(decryptPayload()),
+        payload: dict = Depends(decryptPayload),
         conn: Connection = Depends(get_conn),
         user: SimpleUser = Depends(getCurrentUser)
 ):
@@ -3085,7 +3139,7 @@ async def saveOnboardingData(
     clientId = None
     if email:
         clientId = await conn.fetchval('SELECT client_id FROM "user" WHERE email=$1', email)
-    if not clientId or not await isUUIDv4(str(clientId)):
+    if not clientId:
         raise HTTPException(status_code=400, detail="invalid client")
 
     general = payload.get("general", {})
@@ -3094,7 +3148,11 @@ async def saveOnboardingData(
     loadInfo = payload.get("load", {})
     tradeCoverage = payload.get("tradeCoverage", [])
     pricing = payload.get("pricing", [])
-    references = payload.get("references", [])
+    # only the fields that get stored decide whether a reference row is empty
+    references = [
+        ref for ref in payload.get("references", [])
+        if ref.get("company") or ref.get("contact") or ref.get("email") or ref.get("phone")
+    ]
 
     if not BYPASS_ONBOARDING_CHECKS:
         has_data = any(
@@ -3105,20 +3163,36 @@ async def saveOnboardingData(
                 any(v for v in loadInfo.values()),
                 len(tradeCoverage) > 0,
                 any((p.get("label") or p.get("regular") or p.get("after")) for p in pricing),
-                any(any(r.values()) for r in references),
+                len(references) > 0,
             ]
         )
         if not has_data:
             raise HTTPException(status_code=400, detail="empty onboarding data")
 
     async with conn.transaction():
+        # the four singleton sections go out as one statement (one round trip)
         await conn.execute(
             """
-            INSERT INTO client_onboarding_general (
-              client_id, satellite_office_address, organization_type,
-              establishment_year, annual_revenue, accepted_payment_methods,
-              naics_code, duns_number
-            ) VALUES ($1,$2,$3,$4,$5,$6,$7,$8);
+            WITH general AS (
+              INSERT INTO client_onboarding_general (
+                client_id, satellite_office_address, organization_type,
+                establishment_year, annual_revenue, accepted_payment_methods,
+                naics_code, duns_number
+              ) VALUES ($1,$2,$3,$4,$5,$6,$7,$8)
+            ), service AS (
+              INSERT INTO client_onboarding_service (
+                client_id, coverage_area, admin_staff_count, field_staff_count,
+                licenses, working_hours, covers_after_hours, covers_weekend_calls
+              ) VALUES ($1,$9,$10,$11,$12,$13,$14,$15)
+            ), contact AS (
+              INSERT INTO client_onboarding_contact (
+                client_id, dispatch_supervisor, field_supervisor, management_supervisor,
+                regular_hours_contact, emergency_hours_contact
+              ) VALUES ($1,$16,$17,$18,$19,$20)
+            )
+            INSERT INTO client_onboarding_load (
+              client_id, avg_monthly_tickets_last4, po_source_split, monthly_po_capacity
+            ) VALUES ($1,$21,$22,$23);
             """,
             clientId,
             general.get("satelliteOfficeAddress"),
@@ -3128,16 +3202,6 @@ async def saveOnboardingData(
             general.get("paymentMethods"),
             general.get("naicsCode"),
             general.get("dunsNumber"),
-        )
-
-        await conn.execute(
-            """
-            INSERT INTO client_onboarding_service (
-              client_id, coverage_area, admin_staff_count, field_staff_count,
-              licenses, working_hours, covers_after_hours, covers_weekend_calls
-            ) VALUES ($1,$2,$3,$4,$5,$6,$7,$8);
-            """,
-            clientId,
             service.get("coverageArea"),
             service.get("adminStaffCount"),
             service.get("fieldStaffCount"),
@@ -3145,87 +3209,22 @@ async def saveOnboardingData(
             service.get("workingHours"),
             bool(service.get("coversAfterHours")),
             bool(service.get("coversWeekendCalls")),
-        )
-
-        await conn.execute(
-            """
-            INSERT INTO client_onboarding_contact (
-              client_id, dispatch_supervisor, field_supervisor, management_supervisor,
-              regular_hours_contact, emergency_hours_contact
-            ) VALUES ($1,$2,$3,$4,$5,$6);
-            """,
-            clientId,
             contact.get("dispatchSupervisor"),
             contact.get("fieldSupervisor"),
             contact.get("managementSupervisor"),
             contact.get("regularContact"),
             contact.get("emergencyContact"),
-        )
-
-        await conn.execute(
-            """
-            INSERT INTO client_onboarding_load (
-              client_id, avg_monthly_tickets_last4, po_source_split, monthly_po_capacity
-            ) VALUES ($1,$2,$3,$4);
-            """,
-            clientId,
             loadInfo.get("averageMonthlyTickets"),
             loadInfo.get("poSourceSplit"),
             loadInfo.get("monthlyPOCapacity"),
         )
-
-        for tc in tradeCoverage:
-            tradeValue = tc.get("trade")
-            coverageLevel = tc.get("coverageLevel")
-            if not tradeValue or not coverageLevel:
-                continue
-            tradeId = await conn.fetchval(
-                "SELECT id FROM project_trade WHERE value=$1  LIMIT 1;",
-                tradeValue,
-            )
-            if tradeId:
-                await conn.execute(
-                    """
-                    INSERT INTO client_trade_coverage (
-                      client_id, project_trade_id, coverage_level
-                    ) VALUES ($1,$2,$3);
-                    """,
-                    clientId,
-                    tradeId,
-                    coverageLevel.upper(),
-                )
-
-        for price in pricing:
-            if not price.get("label"):
-                continue
-            await conn.execute(
-                """
-                INSERT INTO client_pricing_structure (
-                  client_id, item_label, regular_hours_rate, after_hours_rate, is_custom
-                ) VALUES ($1,$2,$3,$4,$5);
-                """,
-                clientId,
-                price.get("label"),
-                price.get("regular"),
-                price.get("after"),
-                bool(price.get("isCustom")),
-            )
-
-        for ref in references:
-            if not any(ref.values()):
-                continue
-            await conn.execute(
-                """
-                INSERT INTO client_references (
-                  client_id, company_name, contact_name, contact_email, contact_phone
-                ) VALUES ($1,$2,$3,$4,$5);
-                """,
-                clientId,
-                ref.get("company"),
-                ref.get("contact"),
-                ref.get("email"),
-                ref.get("phone"),
-            )
+        await saveOnboardingDetails(
+            conn,
+            clientId,
+            [tc for tc in tradeCoverage if tc.get("trade") and tc.get("coverageLevel")],
+            [price for price in pricing if price.get("label")],
+            references,
+        )
 
     resp_payload = {"status": "success"}
     if user:
@@ -3236,7 +3235,7 @@ async def saveOnboardingData(
 @app.post("/update-insurance-data")
 async def updateInsuranceData(
         request: Request,
-        payload: dict = Depends(decryptPayload()),
+        payload: dict = Depends(decryptPayload),
         conn: Connection = Depends(get_conn),
         user: SimpleUser = Depends(getCurrentUser)
 ):
@@ -3273,7 +3272,7 @@ async def updateInsuranceData(
 @app.post("/auth/invite")
 async def inviteUser(
         request: Request,
-        data: dict = Depends(decryptPayload()),
+        data: dict = Depends(decryptPayload),
         conn: Connection = Depends(get_conn)
 ):
     emailToInvite = data.get("emailToInvite")
@@ -3303,10 +3302,10 @@ async def inviteUser(
 
 
 @app.post("/update-user")
-async def updateUser(data: dict = Depends(decryptPayload()), conn: Connection = Depends(get_conn)):
+async def updateUser(request: Request, data: dict = Depends(decryptPayload), conn: Connection = Depends(get_conn)):
     user_id = data.get("userId")
 
-    if not user_id or not await isUUIDv4(user_id):
+    if not user_id or not isUUIDv4(user_id):
         raise HTTPException(status_code=400, detail="Invalid userId")
 
     email = data.get("email")
@@ -3330,11 +3329,14 @@ async def updateUser(data: dict = Depends(decryptPayload()), conn: Connection =
         params.append(last_name)
 
     if updates:
-        await conn.execute(
-            f"UPDATE \"user\" SET {', '.join(updates)} WHERE id=${len(params) + 1}",
+        # the joined row is the pre-update one, so this returns the old email
+        oldEmail = await conn.fetchval(
+            f"UPDATE \"user\" u SET {', '.join(updates)} FROM \"user\" o "
+            f"WHERE u.id=${len(params) + 1} AND o.id=u.id RETURNING o.email",
             *params,
             UUID(user_id),
         )
+        await invalidateUserProfile(request.app.state.redis, oldEmail, email)
 
     if role:
         subj = email if email else await conn.fetchval('SELECT email FROM "user" WHERE id=$1', UUID(user_id))
@@ -3345,15 +3347,16 @@ async def updateUser(data: dict = Depends(decryptPayload()), conn: Connection =
 
 
 @app.post("/delete-user")
-async def deleteUser(data: dict = Depends(decryptPayload()), conn: Connection = Depends(get_conn)):
+async def deleteUser(request: Request, data: dict = Depends(decryptPayload), conn: Connection = Depends(get_conn)):
     user_id = data.get("userId")
-    if not user_id or not await isUUIDv4(user_id):
+    if not user_id or not isUUIDv4(user_id):
         raise HTTPException(status_code=400, detail="Invalid userId")
     try:
-        await conn.execute(
-            'UPDATE "user" SET is_deleted=TRUE, deleted_at=now() WHERE id=$1',
+        email = await conn.fetchval(
+            'UPDATE "user" SET is_deleted=TRUE, deleted_at=now() WHERE id=$1 RETURNING email',
             UUID(user_id),
         )
+        await invalidateUserProfile(request.app.state.redis, email)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     return {"status": "deleted"}
@@ -3371,7 +3374,7 @@ TABLE_FIELDS = {
 
 
 @app.post("/admin/create-record")
-async def adminCreateRecord(data: dict = Depends(decryptPayload()), conn: Connection = Depends(get_conn)):
+async def adminCreateRecord(data: dict = Depends(decryptPayload), conn: Connection = Depends(get_conn)):
     table = data.get("table")
     fields = TABLE_FIELDS.get(table)
     if not table or not fields:
@@ -3383,12 +3386,13 @@ async def adminCreateRecord(data: dict = Depends(decryptPayload()), conn: Connec
         newId = await conn.fetchval(sql, *values)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    invalidateLookups(table)
     return {"id": str(newId)}
 
 
 @app.post("/admin/create-endpoint")
 async def adminCreateEndpoint(
-        data: dict = Depends(decryptPayload()),
+        data: dict = Depends(decryptPayload),
         request: Request = None,
         conn: Connection = Depends(get_conn),
         enforcer: AsyncEnforcer = Depends(getEnforcer),
@@ -3408,14 +3412,13 @@ async def adminCreateEndpoint(
         role,
         obj,
     )
-    await enforcer.load_policy()
-    enforcer.build_role_links()
+    await loadPolicy(enforcer)
     request.app.state.casbin_watcher.update()
     return {"status": "created"}
 
 
 @app.post("/admin/update-record")
-async def adminUpdateRecord(data: dict = Depends(decryptPayload()), conn: Connection = Depends(get_conn)):
+async def adminUpdateRecord(data: dict = Depends(decryptPayload), conn: Connection = Depends(get_conn)):
     table = data.get("table")
     recordId = data.get("id")
     fields = TABLE_FIELDS.get(table)
@@ -3435,11 +3438,12 @@ async def adminUpdateRecord(data: dict = Depends(decryptPayload()), conn: Connec
         await conn.execute(sql, *params)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    invalidateLookups(table)
     return {"status": "updated"}
 
 
 @app.post("/admin/delete-record")
-async def adminDeleteRecord(data: dict = Depends(decryptPayload()), conn: Connection = Depends(get_conn)):
+async def adminDeleteRecord(data: dict = Depends(decryptPayload), conn: Connection = Depends(get_conn)):
     table = data.get("table")
     recordId = data.get("id")
     if not table or not recordId or table not in TABLE_FIELDS:
@@ -3449,11 +3453,48 @@ async def adminDeleteRecord(data: dict = Depends(decryptPayload()), conn: Connec
         await conn.execute(sql, UUID(recordId))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    invalidateLookups(table)
     return {"status": "deleted"}
 
 
+ADMIN_LOOKUP_TARGETS = {
+    "project-priority": ("project_priority", None),
+    "project-type": ("project_type", None),
+    "project-trade": ("project_trade", None),
+    "state": ("state", None),
+    "client-type": ("client_type", None),
+    "pay-term": ("pay_term", None),
+    "project-status": ("status", "project"),
+    "quote-status": ("status", "quote"),
+    "invoice-status": ("status", "invoice"),
+    "client-status": ("status", "client"),
+}
+
+
+def lookupTarget(kind: str):
+    target = ADMIN_LOOKUP_TARGETS.get(kind)
+    if not target:
+        raise HTTPException(status_code=404, detail="Unknown lookup")
+    return target
+
+
+@app.post("/admin/update/{kind}")
+async def adminUpdateLookup(kind: str, data: dict = Depends(decryptPayload), conn: Connection = Depends(get_conn)):
+    table, category = lookupTarget(kind)
+    record = {**data, "table": table}
+    if category:
+        record["category"] = category
+    return await adminUpdateRecord(record, conn)
+
+
+@app.post("/admin/delete/{kind}")
+async def adminDeleteLookup(kind: str, data: dict = Depends(decryptPayload), conn: Connection = Depends(get_conn)):
+    table, _ = lookupTarget(kind)
+    return await adminDeleteRecord({"table": table, "id": data.get("id")}, conn)
+
+
 @app.post("/auth/login")
-async def login(request: Request, data: dict = Depends(decryptPayload()), conn: Connection = Depends(get_conn)):
+async def login(request: Request, data: dict = Depends(decryptPayload), conn: Connection = Depends(get_conn)):
     email = data.get("email")
     if not email:
         raise HTTPException(status_code=400, detail="Email required")
@@ -3481,7 +3522,7 @@ async def login(request: Request, data: dict = Depends(decryptPayload()), conn:
 
 
 @app.post("/auth/set-recovery-phrase")
-async def setRecoveryPhrase(request: Request, data: dict = Depends(decryptPayload()),
+async def setRecoveryPhrase(request: Request, data: dict = Depends(decryptPayload),
                             conn: Connection = Depends(get_conn), enforcer: AsyncEnforcer = Depends(getEnforcer)):
     token_str = data.get("token")
     if not token_str:
@@ -3494,14 +3535,14 @@ async def setRecoveryPhrase(request: Request, data: dict = Depends(decryptPayloa
     assign_to = token_payload.get("assignTo")
 
     link_uuid = token_payload.get("uuid")
-    if not link_uuid or not await isUUIDv4(link_uuid):
+    if not link_uuid or not isUUIDv4(link_uuid):
         raise HTTPException(status_code=400, detail="invalid token")
 
     row = await conn.fetchrow(
         "SELECT consumed, expires_at FROM magic_link WHERE uuid=$1",
         UUID(link_uuid),
     )
-    if not row or row["consumed"] or row["expires_at"] < datetime.now(timezone.utc):
+    if not row or row["consumed"] or row["expires_at"].timestamp() < time.time():
         raise HTTPException(status_code=400, detail="invalid token")
 
     # When called with encrypted data, finalize recovery setup
@@ -3572,7 +3613,8 @@ async def setRecoveryPhrase(request: Request, data: dict = Depends(decryptPayloa
         )
 
         jti = str(uuid4())
-        exp_dt = datetime.now(timezone.utc) + timedelta(minutes=60 * 24)
+        now = datetime.now(timezone.utc)
+        exp_dt = now + timedelta(minutes=60 * 24)
         await conn.execute(
             "INSERT INTO jwt_token (jti, user_email, expires_at, revoked) VALUES ($1,$2,$3,FALSE)",
             jti,
@@ -3584,23 +3626,25 @@ async def setRecoveryPhrase(request: Request, data: dict = Depends(decryptPayloa
         await redis.publish("jwt_updates", f"add:{jti}")
         await conn.execute("UPDATE magic_link SET consumed=TRUE WHERE uuid=$1", UUID(link_uuid))
 
-        roles = await enforcer.get_roles_for_user_in_domain(userEmail, "*")
+        roles = await userRoles(enforcer, userEmail)
         await conn.execute(
             "UPDATE \"user\" SET is_active=TRUE, onboarding_done=$2, has_set_recovery_phrase=TRUE WHERE email=$1",
             userEmail,
             not ("client_admin" in roles)
         )
+        await invalidateUserProfile(redis, userEmail)
 
         print(roles)
+        navExp = int(now.timestamp()) + 5 * 60
         if "client_admin" in roles:
             next_payload = {
                 "next_step": "/onboarding",
-                "exp": int((datetime.now(timezone.utc) + timedelta(minutes=5)).timestamp()),
+                "exp": navExp,
             }
         else:
             next_payload = {
                 "next_step": "/dashboard",
-                "exp": int((datetime.now(timezone.utc) + timedelta(minutes=5)).timestamp()),
+                "exp": navExp,
             }
 
         nav_token = generateJwtRs256(next_payload, request.app.state.privateKey)
@@ -3629,7 +3673,7 @@ async def setRecoveryPhrase(request: Request, data: dict = Depends(decryptPayloa
 async def getRecoveryParams(
         request: Request,
         email: str,
-        data: dict = Depends(decryptPayload()),
+        data: dict = Depends(decryptPayload),
         conn: Connection = Depends(get_conn),
         user: SimpleUser = Depends(getCurrentUser)):
     row = await conn.fetchrow(
@@ -3654,7 +3698,7 @@ async def getRecoveryParams(
 
 
 @app.post("/auth/update-client-key")
-async def updateClientKey(request: Request, data: dict = Depends(decryptPayload()),
+async def updateClientKey(request: Request, data: dict = Depends(decryptPayload),
                           conn: Connection = Depends(get_conn)):
     clientPub = data.get("_client_pub")
     iv = data.get("_nonce")
@@ -3688,9 +3732,10 @@ async def revokeToken(request: Request, conn: Connection = Depends(get_conn)):
     if not token:
         raise HTTPException(status_code=401, detail="no token")
     try:
-        data = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
+        data = decodeSession(token)
     except Exception:
         raise HTTPException(status_code=401, detail="invalid")
+    sessionCache.pop(token, None)
     jti = data.get("jti")
     if not jti:
         raise HTTPException(status_code=400, detail="bad token")
@@ -3763,4 +3808,4 @@ async def connectionTest():
 
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    uvicorn.run("app:app", host="0.0.0.0", port=8000, loop="uvloop", http="httptools", workers=os.cpu_count())
@@ -5,6 +5,14 @@ DB_USER = "postgres"
 DB_PASSWORD = "crm-issam"
 DB_NAME = "postgres"
 ASYNCPG_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+# Request traffic can go through PgBouncer (transaction pooling, port 6432).
+# It must run 1.21+ with max_prepared_statements set, since the app relies on
+# asyncpg's prepared statements. LISTEN and schema setup keep using ASYNCPG_URL.
+POOLED_DB_URL = os.getenv("POOLED_DB_URL", ASYNCPG_URL)
+# Per-worker pool bounds; workers x DB_POOL_MAX_SIZE must stay under the
+# server's max_connections (or PgBouncer's default_pool_size)
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "2"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
 
 SECRET_KEY = "dev-secret"
 
@@ -0,0 +1,65 @@
+# tests/test_casbin_policy_routes.py
+import asyncio
+import re
+from pathlib import Path
+
+import asyncpg
+import casbin
+import pytest
+from casbin.persist.adapters import StringAdapter
+
+from constants import ASYNCPG_URL
+from DbManager import POLICY_GRANTS
+
+ROOT = Path(__file__).resolve().parent.parent
+MODEL_CONF = str(ROOT / "model.conf")
+
+# ("p", role, "*", path, "*") rows in DbManager.create_tables' first-boot seed;
+# the admin's "*" object is not a path and is left out
+SEED_RE = re.compile(r'\("p", "(\w+)", "\*", "(/[^"]*)", "\*"\)')
+ROUTE_RE = re.compile(r'@app\.\w+\("([^"]+)"')
+
+
+def seededGrants() -> set[tuple[str, str]]:
+    return {m.groups() for m in SEED_RE.finditer((ROOT / "DbManager.py").read_text())}
+
+
+def routePatterns() -> list[re.Pattern]:
+    routes = ROUTE_RE.findall((ROOT / "app.py").read_text())
+    return [re.compile(re.sub(r"\{[^}]+\}", "[^/]+", r) + "$") for r in routes]
+
+
+# ──────────────────────────── STATIC ─────────────────────────────────────────
+@pytest.mark.parametrize("role, path", sorted(seededGrants() | set(POLICY_GRANTS)))
+def test_policy_path_is_a_route(role, path):
+    """A grant for a path no route serves is a typo the route's users pay for with a 403."""
+    assert any(p.match(path) for p in routePatterns()), f"{role} granted unknown route {path}"
+
+
+# ──────────────────────────── LIVE DATABASE ──────────────────────────────────
+@pytest.fixture(scope="module")
+def enforcer():
+    """
+    Enforcer over the rows actually in casbin_rule. Run against a database that
+    existed before the latest seed changes (after one app start) to catch grants
+    that only the empty-table seed would have added.
+    """
+    loop = asyncio.get_event_loop()
+    conn = loop.run_until_complete(asyncpg.connect(ASYNCPG_URL))
+    rows = loop.run_until_complete(
+        conn.fetch("SELECT ptype, v0, v1, v2, v3 FROM casbin_rule WHERE ptype IN ('p', 'g')")
+    )
+    loop.run_until_complete(conn.close())
+
+    lines = []
+    for r in rows:
+        if r["ptype"] == "p":
+            lines.append(f"p, {r['v0']}, {r['v1']}, {r['v2']}, {r['v3']}")
+        else:
+            lines.append(f"g, {r['v0']}, {r['v1']}, {r['v2'] or '*'}")
+    return casbin.Enforcer(MODEL_CONF, StringAdapter("\n".join(lines)))
+
+
+@pytest.mark.parametrize("role, path", sorted(seededGrants() | set(POLICY_GRANTS)))
+def test_live_policy_grants_route(enforcer, role, path):
+    assert enforcer.enforce(role, "*", path, "post"), f"{role} is denied {path}"
@@ -1,4 +1,4 @@
-import uuid
+import re
 from datetime import datetime, timedelta, timezone
 from uuid import UUID, uuid4
 
@@ -7,13 +7,12 @@ import json
 import jwt
 
 
-async def isUUIDv4(u: str) -> bool:
-    try:
-        val = uuid.UUID(u, version=4)
-    except (ValueError, AttributeError):
-        return False
+# Canonical lowercase-hyphenated UUIDv4 with the RFC 4122 variant
+UUID_V4_RE = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-4[0-9a-f]{3}-[89ab][0-9a-f]{3}-[0-9a-f]{12}\Z")
 
-    return str(val) == u
+
+def isUUIDv4(u: str) -> bool:
+    return isinstance(u, str) and UUID_V4_RE.match(u) is not None
 
 
 async def createMagicLink(